@@ -0,0 +1,57 @@
+"""页面加载基准：冷启动（新进程里第一次运行脚本）和重跑（同一会话再次运行）耗时。
+
+    python bench_pages.py            # 三个工具各测一遍
+    python bench_pages.py --reruns 50
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+TOOLS = ["广告上传模版生成", "关键词拆分去重", "外箱贴自动化工具"]
+
+
+def measure(tool, reruns):
+    """在当前进程里：第一次运行（含 import）+ 多次重跑，返回 (首次秒数, 重跑秒数列表)"""
+    started = time.perf_counter()
+    at = AppTest.from_file('app.py', default_timeout=60)
+    at.run()
+    if tool != TOOLS[0]:
+        at.sidebar.radio[0].set_value(tool).run()
+    first = time.perf_counter() - started
+    times = []
+    for _ in range(reruns):
+        started = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - started)
+    return first, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="页面冷启动/重跑耗时基准")
+    parser.add_argument('--reruns', type=int, default=20)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        first, times = measure(args.child, args.reruns)
+        print(json.dumps({'first': first, 'times': times}))
+        return
+
+    print(f"{'tool':<12} {'cold start':>12} {'rerun median':>14} {'rerun p90':>12}")
+    for tool in TOOLS:
+        # 冷启动要在全新进程里测，才包含 pandas/openpyxl 等模块的导入
+        out = subprocess.run([sys.executable, __file__, '--child', tool, '--reruns', str(args.reruns)],
+                             capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        times = sorted(result['times'])
+        p90 = times[int(len(times) * 0.9) - 1] if times else 0.0
+        print(f"{tool:<12} {result['first'] * 1000:>10.0f}ms {statistics.median(times) * 1000:>12.1f}ms {p90 * 1000:>10.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
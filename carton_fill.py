@@ -0,0 +1,539 @@
+"""外箱贴填表逻辑：读取发货计划表，填写 FBA 发货模板和装箱信息表。
+
+不依赖 streamlit：页面逐个处理和批量处理（子进程并行）共用这里的函数。
+"""
+import concurrent.futures
+import csv
+import io
+import json
+import multiprocessing
+import numbers
+import os
+import re
+import zipfile
+
+import numpy as np
+import pandas as pd
+from openpyxl.cell.cell import MergedCell
+
+import xlsx_patch
+from xlsx_stream import read_sheet_frame
+
+BATCH_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def save_wb(wb):
+    out = io.BytesIO()
+    wb.save(out)
+    return out.getvalue()
+
+def safe_write(ws, row, col, value, protect_formula=True):
+    try:
+        cell = ws.cell(row=row, column=col)
+        if isinstance(cell, MergedCell):
+            for merged_range in ws.merged_cells.ranges:
+                if cell.coordinate in merged_range:
+                    target_cell = ws.cell(row=merged_range.min_row, column=merged_range.min_col)
+                    if protect_formula and target_cell.value and str(target_cell.value).startswith('='):
+                        return
+                    target_cell.value = value
+                    return
+        else:
+            if protect_formula and cell.value and str(cell.value).startswith('='):
+                return
+            cell.value = value
+    except:
+        pass
+
+def safe_write_cells(ws, cells, protect_formula=True):
+    """批量写入 [(行, 列, 值)]，每个单元格按 safe_write 的规则（合并区域写左上角、不覆盖公式）"""
+    for row, col, value in cells:
+        safe_write(ws, row, col, value, protect_formula)
+
+def parse_box_range(box_val, qty_val):
+    results = []
+    try:
+        if isinstance(box_val, (int, float)) or (isinstance(box_val, str) and box_val.replace('.','',1).isdigit()):
+            results.append((int(float(box_val)), qty_val))
+        elif isinstance(box_val, str) and '-' in box_val:
+            nums = re.findall(r'\d+', box_val)
+            if len(nums) == 2:
+                start, end = int(nums[0]), int(nums[1])
+                if start <= end:
+                    for b in range(start, end + 1):
+                        results.append((b, qty_val))
+    except: pass
+    return results
+
+
+# ======== 箱号分配：SKU×箱号 稀疏数量矩阵 ========
+PLAIN_NUMBER_PATTERN = r'\d+\.?\d*|\.\d+'   # '3'、'3.0'、'.5'：不带符号和指数的数字文本（单个箱号、重量）
+BOX_RANGE_PATTERN = r'^\D*(\d+)\D+(\d+)\D*$'  # 恰好两段数字，例如 '3-7'
+ALLOCATION_COLUMNS = ['row', 'pair', 'sku', 'box', 'qty']
+
+def expand_box_ranges(box_values):
+    """一列箱号单元格批量展开，返回 (单元格位置, 箱号) 两个数组，规则与 parse_box_range 相同：
+    数字和 '3' 这样的文本为单个箱号（截断取整），含 - 且恰好两段数字的文本展开为连续箱号（起始大于结束时忽略）"""
+    values = pd.Series(list(box_values), dtype=object)
+    is_text = values.map(lambda v: isinstance(v, str)).astype(bool)
+    is_number = ~is_text & values.map(lambda v: isinstance(v, numbers.Real)).astype(bool)
+    positions, boxes = [], []
+
+    numeric = values[is_number].astype(float)
+    numeric = numeric[np.isfinite(numeric)]
+    positions.append(numeric.index.to_numpy())
+    boxes.append(np.trunc(numeric.to_numpy()).astype(np.int64))
+
+    text = values[is_text].astype(str)
+    single = text[text.str.fullmatch(PLAIN_NUMBER_PATTERN)]
+    positions.append(single.index.to_numpy())
+    boxes.append(single.astype(float).to_numpy().astype(np.int64))
+
+    ranged = text[text.str.contains('-', regex=False)].str.extract(BOX_RANGE_PATTERN).dropna().astype(np.int64)
+    ranged = ranged[ranged[0] <= ranged[1]]
+    counts = (ranged[1] - ranged[0] + 1).to_numpy()
+    offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    positions.append(np.repeat(ranged.index.to_numpy(), counts))
+    boxes.append(np.repeat(ranged[0].to_numpy(), counts) + offsets)
+
+    positions = np.concatenate(positions).astype(np.int64)
+    boxes = np.concatenate(boxes).astype(np.int64)
+    order = np.argsort(positions, kind='stable')  # 同一单元格展开的箱号保持升序
+    return positions[order], boxes[order]
+
+def box_allocation(plan_data):
+    """计划表一次转换成 SKU×箱号 的稀疏数量矩阵：每个 (计划行, 箱号) 一条记录（row 为计划表内的行位置，pair 为第几组箱号列）。
+    箱号列按 '箱号'↔'数量'、'箱号N'↔'数量N' 配对；没有对应数量列或数量为空时 qty 为 NaN（校验箱号时算作用到了，填表时跳过）"""
+    box_cols = [c for c in plan_data.columns if '箱号' in str(c)]
+    box_cols.sort(key=lambda c: str(c) != '箱号')  # '箱号' 这一组排在最前，同一箱号写多次时后写的生效
+    skus = plan_data['店铺SKU'].astype(str).str.strip().to_numpy() if '店铺SKU' in plan_data.columns else None
+    frames = []
+    for pair, col in enumerate(box_cols):
+        q_col = f"数量{str(col).replace('箱号', '')}"
+        cells = plan_data[col]
+        present = np.flatnonzero(cells.notna().to_numpy())
+        positions, boxes = expand_box_ranges(cells.iloc[present])
+        rows = present[positions]
+        if q_col in plan_data.columns:
+            qty = pd.to_numeric(plan_data[q_col], errors='coerce').to_numpy(dtype=float)[rows]
+        else:
+            qty = np.full(len(rows), np.nan)
+        frames.append(pd.DataFrame({'row': rows, 'pair': pair, 'sku': skus[rows] if skus is not None else '',
+                                    'box': boxes, 'qty': qty}))
+    if not frames:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in zip(ALLOCATION_COLUMNS, ['int64', 'int64', object, 'int64', float])})
+    return pd.concat(frames, ignore_index=True).sort_values(['row', 'pair'], kind='stable', ignore_index=True)
+
+def box_totals(allocation):
+    """每箱件数：箱号 -> 数量合计（只算数量大于 0 的记录）"""
+    packed = allocation[allocation['qty'] > 0]
+    return packed.groupby('box')['qty'].sum()
+
+def reconcile_quantities(plan_data, allocation):
+    """计划发货数量与各箱数量合计对不上的 SKU：[(SKU, 实际发货数量, 装箱合计)]；计划表没有填数量的箱号列时不核对"""
+    packed = allocation[allocation['qty'] > 0]
+    if packed.empty:
+        return []
+    planned = pd.to_numeric(plan_data[shipping_column(plan_data)], errors='coerce').to_numpy(dtype=float)
+    packed_qty = np.zeros(len(plan_data))
+    np.add.at(packed_qty, packed['row'].to_numpy(), packed['qty'].to_numpy())
+    mismatch = np.flatnonzero(~np.isclose(planned, packed_qty))
+    skus = plan_data['店铺SKU'].astype(str).str.strip().to_numpy()
+    return [(skus[i], _excel_number(planned[i]), _excel_number(packed_qty[i])) for i in mismatch]
+
+def _excel_number(value):
+    """整数值写成 int，其它保持 float（与 Excel 里看到的一致）"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+# ======== 第一步：发货计划表 -> 箱规、发货 SKU、FBA 模板 ========
+
+BOX_TABLE_COLUMNS = ['length', 'width', 'height', 'weight']  # 厘米 / 千克
+DIM_NUMBER_PATTERN = re.compile(r'\d+\.?\d*')
+# 恰好三段数字的尺寸文本（'60*40*35'、'60.5*40*35cm'）：配合 DIM_NUMBER_PATTERN 计数，拆分结果与 re.findall 相同
+DIMENSIONS_PATTERN = re.compile(r'^\D*(\d+\.?\d*)\D+(\d+\.?\d*)\D+(\d+\.?\d*)\D*$')
+
+def empty_box_table():
+    return pd.DataFrame({c: pd.Series(dtype=float) for c in BOX_TABLE_COLUMNS}, index=pd.Index([], dtype='int64', name='box'))
+
+def _dimensions(text):
+    """尺寸文本批量拆成 长/宽/高 三列 float；不含 * 或不是恰好三段数字的行为 NaN"""
+    valid = text.str.contains('*', regex=False) & (text.str.count(DIM_NUMBER_PATTERN) == 3)
+    return text.where(valid).str.extract(DIMENSIONS_PATTERN).astype(float)
+
+def _box_table(boxes, dims, weights):
+    table = pd.DataFrame(np.column_stack([dims, weights]), columns=BOX_TABLE_COLUMNS,
+                         index=pd.Index(np.asarray(boxes, dtype=np.int64), name='box'))
+    return table[~table.index.duplicated(keep='last')].sort_index()  # 同一箱号出现多次时以最后一行为准
+
+def extract_box_info(raw_df):
+    """从计划表底部的箱规区（箱号/尺寸/重量）读出箱规表：按箱号索引，列为 长/宽/高（厘米）和重量（千克）。
+    找不到同时含“箱号”“尺寸”的表头行时，按前几列里 '60*40*35' 这样的文本逐行猜箱号"""
+    if raw_df.empty:
+        return empty_box_table()
+    # 所有单元格按列转成文本（空单元格为 ''），表头定位和尺寸拆分都在整列上做
+    text = raw_df.apply(lambda col: col.astype(str).where(col.notna(), ''))
+    has_dim = text.apply(lambda col: col.str.contains('尺寸', regex=False)).to_numpy()
+    has_box = text.apply(lambda col: col.str.contains('箱号', regex=False)).to_numpy()
+    header_rows = np.flatnonzero(has_dim.any(axis=1) & has_box.any(axis=1))
+
+    if header_rows.size:
+        header = header_rows[0]
+        header_text = text.iloc[header]
+        box_col_map = {key: np.flatnonzero(header_text.str.contains(word, regex=False).to_numpy())
+                       for key, word in [('box_num', '箱号'), ('dim', '尺寸'), ('weight', '重量')]}
+        body = text.iloc[header + 1:]
+        dims = _dimensions(body.iloc[:, box_col_map['dim'][-1]])
+        box_text = body.iloc[:, box_col_map['box_num'][-1]]
+        boxes = box_text.where(box_text.str.fullmatch(PLAIN_NUMBER_PATTERN)).astype(float)
+        if box_col_map['weight'].size:
+            weight_text = body.iloc[:, box_col_map['weight'][-1]]
+            weights = weight_text.where(weight_text.str.fullmatch(PLAIN_NUMBER_PATTERN)).astype(float).fillna(0.0)
+        else:
+            weights = pd.Series(0.0, index=body.index)
+        keep = (dims.notna().all(axis=1) & boxes.notna()).to_numpy()
+        return _box_table(np.trunc(boxes.to_numpy()[keep]), dims.to_numpy()[keep], weights.to_numpy()[keep])
+
+    first = text.iloc[:, 0]
+    second = text.iloc[:, 1] if text.shape[1] > 1 else pd.Series('', index=text.index)
+    skip = first.str.contains('-', regex=False) & (first.str.len() > 5)
+    dims = _dimensions(second.where(second.str.contains('*', regex=False), first))
+    rows = np.flatnonzero((~skip & dims.notna().all(axis=1)).to_numpy())
+    if text.shape[1] > 2:
+        weight_cells = raw_df.iloc[:, 2]
+        if text.shape[1] > 3:
+            weight_cells = weight_cells.where(weight_cells.notna(), raw_df.iloc[:, 3])
+        weights = pd.to_numeric(weight_cells, errors='coerce').fillna(0.0).to_numpy()
+    else:
+        weights = np.zeros(len(raw_df))
+    stripped = first.str.strip()
+    explicit = stripped.where(stripped.str.isdigit())
+    # 没写箱号的行按已识别的箱数顺延（与逐行填字典时 len(box_info) + 1 的规则相同）
+    assigned = {}
+    for pos, number in zip(rows.tolist(), explicit.iloc[rows].tolist()):
+        assigned[int(number) if isinstance(number, str) else len(assigned) + 1] = pos
+    positions = np.array(list(assigned.values()), dtype=np.int64)
+    return _box_table(list(assigned), dims.to_numpy()[positions], weights[positions])
+
+def shipping_column(plan_data):
+    return [c for c in plan_data.columns if '实际发货数量' in str(c)][0]
+
+def extract_plan_data(raw_df):
+    """发货的 SKU 行：有店铺SKU、不含 *（合计/备注行）、实际发货数量 > 0"""
+    df = raw_df.dropna(subset=['店铺SKU'])
+    df = df[~df['店铺SKU'].astype(str).str.contains(r'\*')]
+    return df[df[shipping_column(df)] > 0]
+
+def check_box_sequence(plan_data, box_info, allocation=None):
+    """箱号交叉校验：返回 (最大箱号, 没有任何产品的箱号, 缺尺寸重量的箱号, 数量对不上的 SKU)；
+    计划表里既没有箱号也没有箱规时返回 None。allocation 为 box_allocation 的结果，不传时现算"""
+    if allocation is None:
+        allocation = box_allocation(plan_data)
+    used_boxes = np.unique(allocation['box'].to_numpy())
+    known_boxes = box_info.index.to_numpy(dtype=np.int64)
+
+    if not (used_boxes.size or known_boxes.size):
+        return None
+    max_b = int(max(used_boxes.max(initial=0), known_boxes.max(initial=0)))
+    missing_skus = np.setdiff1d(np.arange(1, max_b + 1), used_boxes).tolist()
+    missing_dims = np.setdiff1d(used_boxes, known_boxes).tolist()
+    return max_b, missing_skus, missing_dims, reconcile_quantities(plan_data, allocation)
+
+def fill_fba_template(fba_template_file, plan_data):
+    """把发货 SKU 和数量写进 FBA 模板（清掉表头下的旧数据），返回工作簿字节；找不到 Merchant SKU 表头返回 None"""
+    target_col = shipping_column(plan_data)
+    fba_wb = xlsx_patch.load_workbook(fba_template_file)  # 只改模板工作表里写到的行，其它内容原样保留
+    fba_ws = fba_wb['Template'] if 'Template' in fba_wb.sheetnames else fba_wb.active
+
+    header_row_fba, sku_col_fba, qty_col_fba = 0, 1, 2
+    for r in range(1, 25):
+        row_vals = [str(fba_ws.cell(row=r, column=c).value) for c in range(1, 15)]
+        if "Merchant SKU" in row_vals:
+            header_row_fba, sku_col_fba = r, row_vals.index("Merchant SKU") + 1
+            for idx, val in enumerate(row_vals):
+                if "Quantity" in val and "Units" not in val:
+                    qty_col_fba = idx + 1
+            break
+
+    if header_row_fba == 0:
+        return None
+    if fba_ws.max_row > header_row_fba:
+        fba_ws.delete_rows(header_row_fba + 1, fba_ws.max_row)
+    curr_row = header_row_fba + 1
+    for _, row_data in plan_data.iterrows():
+        safe_write(fba_ws, curr_row, sku_col_fba, row_data['店铺SKU'])
+        safe_write(fba_ws, curr_row, qty_col_fba, row_data[target_col])
+        curr_row += 1
+    return save_wb(fba_wb)
+
+def fba_upload_text(plan_data):
+    """亚马逊批量上传用的 TXT（sku\\tquantity）"""
+    txt_df = plan_data[['店铺SKU', shipping_column(plan_data)]].copy()
+    txt_df.columns = ['sku', 'quantity']
+    return txt_df.to_csv(index=False, sep='\t', encoding='utf-8')
+
+
+# ======== 第二步：装箱信息表 ========
+# 装箱信息表里 重量/长/宽/高 行的标签关键词 -> (箱规列, 英制单位关键词, 英制换算系数)；箱规表是公制（千克/厘米）
+UNIT_ROW_LABELS = {
+    '重量': ('weight', ('磅', 'lb'), 2.2046),
+    '宽度': ('width', ('英寸', 'in'), 0.3937),
+    '长度': ('length', ('英寸', 'in'), 0.3937),
+    '高度': ('height', ('英寸', 'in'), 0.3937),
+}
+
+# 承运商默认箱规：海运或计划表里没有箱规的箱子按这里填。每列 (公制值, 英制值)，英制是常用的整数规格，不是公制值的换算
+CARRIER_PROFILES = {
+    '海运': {'weight': (15.0, 33.0), 'length': (61.0, 24.0), 'width': (51.0, 20.0), 'height': (48.0, 19.0)},
+}
+DEFAULT_CARRIER = '海运'
+
+def load_carrier_profiles(path=None):
+    """内置承运商默认箱规，加上 JSON 文件里的（同名覆盖）：{名称: {"weight": [千克, 磅], "length": [厘米, 英寸], ...}}。
+    只给一个数时按系数换算出英制值"""
+    profiles = dict(CARRIER_PROFILES)
+    if not path:
+        return profiles
+    with open(path, encoding='utf-8') as f:
+        extra = json.load(f)
+    factors = {field: factor for field, _, factor in UNIT_ROW_LABELS.values()}
+    for name, values in extra.items():
+        missing = [field for field in BOX_TABLE_COLUMNS if field not in values]
+        if missing:
+            raise ValueError(f"承运商默认箱规 {name} 缺少 {missing}")
+        profile = {}
+        for field in BOX_TABLE_COLUMNS:
+            value = values[field]
+            metric, imperial = (value, round(value * factors[field], 2)) if isinstance(value, (int, float)) else value
+            profile[field] = (float(metric), float(imperial))
+        profiles[name] = profile
+    return profiles
+
+def conversion_plan(label_rows):
+    """label_rows: 模板里 重量/长/宽/高 行 {标签关键词: (行号, 标签)}。单位只按标签判断一次：
+    返回 [(行号, 箱规列, 换算系数, 是否英制)]"""
+    plan = []
+    for keyword, (row, label) in label_rows.items():
+        field, imperial_words, factor = UNIT_ROW_LABELS[keyword]
+        imperial = any(x in label for x in imperial_words)
+        plan.append((row, field, factor if imperial else 1.0, imperial))
+    return plan
+
+def box_metric_cells(plan, used_boxes, box_info, profile):
+    """用到的箱子 [(箱号, 列号)] 的 重量/长/宽/高 单元格 [(行, 列, 值)]，每行对所有箱子一次算完：
+    box_info 里有的箱子按实际箱规换算（box_info 为 None 时不用），其余用承运商默认箱规"""
+    if not plan or not used_boxes:
+        return []
+    boxes = [b for b, _ in used_boxes]
+    cols = [c for _, c in used_boxes]
+    actual = (box_info if box_info is not None else empty_box_table()).reindex(boxes)
+    has_actual = actual.notna().all(axis=1).to_numpy()
+    cells = []
+    for row, field, factor, imperial in plan:
+        values = np.where(has_actual, actual[field].to_numpy() * factor, profile[field][int(imperial)])
+        # 保留两位用 Python 的 round（正确舍入，与逐个写入时的结果一致；np.round 在 x.xx5 附近可能差一位）
+        cells += [(row, col, round(value, 2)) for col, value in zip(cols, values.tolist())]
+    return cells
+
+
+def box_quantity_column(col_map, b_num):
+    """装箱信息表里第 b_num 箱数量所在的列，没有返回 None"""
+    if f'包装箱 {b_num} 数量' in col_map:
+        return col_map[f'包装箱 {b_num} 数量']
+    for k in col_map:
+        if f"包装箱 {b_num}" in str(k) and "数量" in str(k):
+            return col_map[k]
+    return None
+
+def fill_packing_list(cus_template_file, plan_data, box_info, express, allocation=None, profile=None):
+    """按计划表的箱号/数量填写每箱数量，再给实际用到的箱子填重量和尺寸（express: 快递按计划表箱规换算，否则用默认箱规）。
+    allocation 为 box_allocation 的结果，不传时现算；profile 为承运商默认箱规，不传时用海运默认值。
+    返回 (工作簿字节, 实际填充箱数)；找不到 SKU 表头返回 None"""
+    if allocation is None:
+        allocation = box_allocation(plan_data)
+    if profile is None:
+        profile = CARRIER_PROFILES[DEFAULT_CARRIER]
+    cus_wb = xlsx_patch.load_workbook(cus_template_file)
+    cus_ws = next((sheet for sheet in cus_wb.worksheets if "包装" in sheet.title), cus_wb.worksheets[0])
+
+    header_row_cus = 0
+    for r in range(1, 50):
+        row_content = [str(cus_ws.cell(row=r, column=c).value or "").strip().upper() for c in range(1, 31)]
+        if any(k in row_content for k in ["FNSKU", "SKU", "MERCHANT SKU"]):
+            header_row_cus = r
+            break
+
+    if header_row_cus == 0:
+        return None
+    col_map = {str(cus_ws.cell(row=header_row_cus, column=c).value or "").strip(): c for c in range(1, cus_ws.max_column + 1)}
+    sku_col_idx = col_map.get('SKU', col_map.get('Merchant SKU', col_map.get('FNSKU', 1)))
+    expected_qty_col_idx = col_map.get('预计数量', 10)
+
+    target_col = shipping_column(plan_data)
+
+    # 模板里的 SKU 行（到第一个空 SKU 为止）-> 计划表行；计划表里同一 SKU 有多行时以最后一行为准
+    template_rows, template_skus = [], []
+    for curr_row in range(header_row_cus + 1, cus_ws.max_row + 1):
+        sku_cell_value = cus_ws.cell(row=curr_row, column=sku_col_idx).value
+        if not sku_cell_value or str(sku_cell_value).strip() in ["", "None"]: break
+        template_rows.append(curr_row)
+        template_skus.append(str(sku_cell_value).strip())
+    plan_keys = plan_data['店铺SKU'].astype(str).str.strip()
+    plan_row_of = pd.Series(np.arange(len(plan_data)), index=plan_keys.to_numpy())
+    plan_row_of = plan_row_of[~plan_row_of.index.duplicated(keep='last')]
+    matched = pd.DataFrame({'sheet_row': template_rows, 'row': plan_row_of.reindex(template_skus).to_numpy()}).dropna()
+    matched['row'] = matched['row'].astype(np.int64)
+
+    # 预计数量 + 每箱数量：从分配矩阵一次算出所有要写的单元格
+    planned = plan_data[target_col].tolist()
+    cells = [(r, expected_qty_col_idx, planned[p]) for r, p in zip(matched['sheet_row'], matched['row'])]
+    packed = allocation[allocation['qty'] > 0].merge(matched, on='row', sort=False)
+    box_cols = {b: box_quantity_column(col_map, b) for b in packed['box'].unique().tolist()}
+    packed['col'] = packed['box'].map(box_cols)
+    packed = packed.dropna(subset=['col']).sort_values(['sheet_row', 'pair'], kind='stable')
+    packed = packed.drop_duplicates(['sheet_row', 'col'], keep='last')  # 同一格写多次时后写的生效
+    cells += [(r, int(c), _excel_number(q)) for r, c, q in zip(packed['sheet_row'], packed['col'], packed['qty'])]
+    safe_write_cells(cus_ws, cells)
+
+    max_box = max([int(re.findall(r'\d+', str(c))[-1]) for c in col_map.keys() if re.search(r"包装箱\s*\d+\s*数量|Box\s*\d+\s*Quantity", str(c), re.I) and re.findall(r'\d+', str(c))], default=4)
+
+    log_rows = {}
+    for r in range(header_row_cus + 1, cus_ws.max_row + 1):
+        label = str(cus_ws.cell(row=r, column=1).value or "")
+        for keyword in UNIT_ROW_LABELS:
+            if keyword in label: log_rows[keyword] = (r, label)
+
+    limit_row = min([r_idx for r_idx, txt in log_rows.values()]) if log_rows else cus_ws.max_row
+    used_boxes = []
+    for c_name, c_idx in col_map.items():
+        if not ("包装箱" in str(c_name) or "P1 - B" in str(c_name)): continue
+        match = re.findall(r'\d+', str(c_name))
+        if not match: continue
+        b_num = int(match[-1])
+        if b_num < 1 or b_num > max_box: continue
+
+        is_box_used = any(isinstance(cus_ws.cell(row=r, column=c_idx).value, (int, float)) and cus_ws.cell(row=r, column=c_idx).value > 0 for r in range(header_row_cus + 1, limit_row))
+        if is_box_used:
+            used_boxes.append((b_num, c_idx))
+
+    safe_write_cells(cus_ws, box_metric_cells(conversion_plan(log_rows), used_boxes, box_info if express else None, profile))
+    return save_wb(cus_wb), len(used_boxes)
+
+
+# ======== 批量：多个货件一次处理 ========
+SHIPMENT_ID_PATTERN = re.compile(r'FBA[0-9A-Z]{6,}', re.IGNORECASE)
+# 文件名里表示文件种类的词，去掉后剩下的部分作为货件标识（例如 "A01-发货计划表" 和 "A01-SKU空白模版" 都是 A01）
+FILE_ROLE_PATTERN = re.compile(r'发货计划表|计划表|原始|SKU\s*空白模[版板]|空白模[版板]|模[版板]|包装箱表|装箱信息表|包装箱|装箱表')
+SEPARATOR_PATTERN = re.compile(r'[\s_\-—()（）《》\[\]【】]+')
+
+BATCH_REPORT_COLUMNS = ['货件', '发货计划表', 'SKU空白模版', '包装箱表', '状态', '发货SKU数', '箱数', '说明']
+
+def shipment_key(filename):
+    """文件名 -> 货件标识：有货件编号（FBA 开头）时用编号，否则用去掉文件种类词后的文件名"""
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    match = SHIPMENT_ID_PATTERN.search(stem)
+    if match:
+        return match.group(0).upper()
+    key = SEPARATOR_PATTERN.sub(' ', FILE_ROLE_PATTERN.sub('', stem)).strip().upper()
+    return key or stem.upper()
+
+def match_shipments(plans, templates, packing_lists):
+    """按货件标识配对：plans/templates/packing_lists 为 [(文件名, 字节)]。
+    只有一个 SKU 空白模版时所有货件共用；包装箱表可选。返回 (货件列表, 没配上的文件名列表)"""
+    templates_by_key = {shipment_key(name): (name, data) for name, data in templates}
+    packing_by_key = {shipment_key(name): (name, data) for name, data in packing_lists}
+    shared_template = templates[0] if len(templates) == 1 else None
+    shipments = []
+    used_keys = set()
+    for name, data in plans:
+        key = shipment_key(name)
+        # 同一标识的计划表有多个时各占一个输出目录
+        folder = key if key not in used_keys else f"{key} ({sum(1 for s in shipments if s['match_key'] == key) + 1})"
+        used_keys.add(key)
+        shipments.append({
+            'key': folder,
+            'match_key': key,
+            'plan': (name, data),
+            'template': shared_template or templates_by_key.get(key),
+            'packing': packing_by_key.get(key),
+        })
+    unmatched = [name for key, (name, _) in templates_by_key.items() if key not in used_keys and shared_template is None]
+    unmatched += [name for key, (name, _) in packing_by_key.items() if key not in used_keys]
+    return shipments, unmatched
+
+def process_shipment(shipment, express, profile=None):
+    """处理一个货件（在子进程里运行）：返回 (输出文件 {文件名: 字节}, 报告行)。
+    校验不通过或出错时不输出文件，原因写在报告里"""
+    plan_name, plan_bytes = shipment['plan']
+    report = {'货件': shipment['key'], '发货计划表': plan_name,
+              'SKU空白模版': shipment['template'][0] if shipment['template'] else '',
+              '包装箱表': shipment['packing'][0] if shipment['packing'] else '',
+              '状态': '失败', '发货SKU数': 0, '箱数': '', '说明': ''}
+    notes = []
+    files = {}
+    try:
+        if shipment['template'] is None:
+            report['说明'] = "未找到对应的 SKU 空白模版"
+            return files, report
+        raw_df = read_sheet_frame(plan_bytes)
+        box_info = extract_box_info(raw_df)
+        plan_data = extract_plan_data(raw_df)
+        allocation = box_allocation(plan_data)
+        report['发货SKU数'] = len(plan_data)
+
+        check = check_box_sequence(plan_data, box_info, allocation)
+        if check is not None:
+            max_b, missing_skus, missing_dims, qty_mismatch = check
+            report['箱数'] = max_b
+            if missing_skus:
+                report['说明'] = f"第 {missing_skus} 箱没有任何产品（最大箱号 {max_b}），请确保箱号连续"
+                return files, report
+            if missing_dims:
+                notes.append(f"箱号 {missing_dims} 缺少重量尺寸信息")
+            if qty_mismatch:
+                notes.append("装箱数量与实际发货数量不一致：" + '，'.join(f"{sku} 计划 {planned} 装箱 {packed}"
+                                                            for sku, planned, packed in qty_mismatch))
+
+        fba_bytes = fill_fba_template(io.BytesIO(shipment['template'][1]), plan_data)
+        if fba_bytes is None:
+            report['说明'] = "SKU 空白模版里未找到 Merchant SKU 表头"
+            return files, report
+        files['FBA_Filled.xlsx'] = fba_bytes
+        files['FBA_Upload_Full.txt'] = fba_upload_text(plan_data).encode('utf-8')
+
+        if shipment['packing'] is not None:
+            packing_name, packing_bytes = shipment['packing']
+            filled = fill_packing_list(io.BytesIO(packing_bytes), plan_data, box_info, express, allocation, profile)
+            if filled is None:
+                notes.append("包装箱表里未找到 SKU 表头，未填写")
+            else:
+                files[os.path.basename(packing_name)], actual_filled_boxes = filled
+                notes.append(f"装箱信息表实际填充 {actual_filled_boxes} 箱")
+        report['状态'] = '成功'
+    except Exception as e:
+        files = {}
+        notes.append(f"处理出错：{e}")
+    report['说明'] = '；'.join(notes)
+    return files, report
+
+def run_batch(shipments, express, profile=None, workers=BATCH_WORKERS):
+    """多个货件并行处理（openpyxl 读写是纯 Python 计算，用子进程并行），
+    返回 (zip 字节, 报告行列表)：每个货件一个目录，根目录放 处理报告.csv"""
+    with concurrent.futures.ProcessPoolExecutor(max(1, min(workers, len(shipments))),
+                                                mp_context=multiprocessing.get_context('spawn')) as executor:
+        results = list(executor.map(process_shipment, shipments, [express] * len(shipments), [profile] * len(shipments)))
+
+    output_buffer = io.BytesIO()
+    reports = []
+    with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for files, report in results:
+            for name, data in files.items():
+                zf.writestr(f"{report['货件']}/{name}", data)
+            reports.append(report)
+        report_text = io.StringIO()
+        writer = csv.DictWriter(report_text, BATCH_REPORT_COLUMNS, lineterminator='\n')
+        writer.writeheader()
+        writer.writerows(reports)
+        zf.writestr('处理报告.csv', report_text.getvalue().encode('utf-8-sig'))  # 带 BOM，Excel 直接打开不乱码
+    return output_buffer.getvalue(), reports
@@ -0,0 +1,304 @@
+"""Header 文件输出：Excel / TSV / CSV 写出，以及按行数/大小拆分成多个文件（同一广告活动不拆开）。
+
+不依赖 streamlit，拆分时写文件的子进程只需要导入这个模块。
+行数很多时用 RowBuffer 暂存：超过内存上限后转存到临时 SQLite 文件，写出时按块流式读取，
+Excel 用 openpyxl 的只写模式逐行写，不再整表建 DataFrame/工作簿。
+"""
+import collections
+import concurrent.futures
+import csv
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import zipfile
+from datetime import datetime
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, Side
+
+# 格式 -> (界面名称, 分隔符；None 表示 Excel 工作簿)
+OUTPUT_FORMATS = {
+    'xlsx': ('Excel 工作簿 (.xlsx)', None),
+    'tsv': ('TSV 制表符分隔 (.tsv)', '\t'),
+    'csv': ('CSV 逗号分隔 (.csv)', ','),
+}
+OUTPUT_MIME = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'tsv': 'text/tab-separated-values',
+    'csv': 'text/csv',
+    'zip': 'application/zip',
+}
+
+CAMPAIGN_ID_COL = 3  # 两个 Sheet 的第 4 列都是 '广告活动编号'，同一活动的行在输出里是连续的
+SHARD_WRITE_WORKERS = min(4, os.cpu_count() or 1)
+SPILL_BYTES = 256 * 2**20   # RowBuffer 默认内存上限
+SPILL_CHUNK_ROWS = 20000    # 转存后每攒这么多行写一次盘，读取时也按这个块大小取
+# Excel 列头样式：与 pandas 2.x 的 DataFrame.to_excel 写出的列头相同（加粗、细边框、水平居中、顶端对齐）
+HEADER_FONT = Font(bold=True)
+HEADER_BORDER = Border(*(Side(style='thin'),) * 4)
+HEADER_ALIGNMENT = Alignment(horizontal='center', vertical='top')
+
+
+class RowBuffer:
+    """一个 sheet 的输出行，按追加顺序保存。内存占用不超过 spill_bytes（按每行列表的大小估算）时就是内存里的 list；
+    超过后整批转存到 SQLite 临时库（rowid 即行顺序，单元格按原类型存取），之后的行每攒一块写一次盘。
+    遍历和切片按块从文件读取，内存里最多保留一块（块大小不超过内存上限对应的行数）。
+    临时库在连接关闭（close / with 块结束，或对象被回收）时由 SQLite 自动删除，目录跟随 SQLite 的临时目录设置（如 SQLITE_TMPDIR）"""
+
+    def __init__(self, width, spill_bytes=SPILL_BYTES):
+        self.width = width
+        self.spill_rows = max(1, int(spill_bytes // sys.getsizeof([None] * width)))
+        self.chunk_rows = min(SPILL_CHUNK_ROWS, self.spill_rows)  # 转存后每攒这么多行写一次盘
+        self.pending = []   # 还没写盘的行
+        self.stored = 0     # 已写盘的行数
+        self.conn = None
+
+    def __len__(self):
+        return self.stored + len(self.pending)
+
+    @property
+    def spilled(self):
+        return self.conn is not None
+
+    def append(self, row):
+        self.pending.append(row)
+        if len(self.pending) >= (self.chunk_rows if self.conn else self.spill_rows):
+            self._spill()
+
+    def extend(self, rows):
+        self.pending.extend(rows)
+        if len(self.pending) >= (self.chunk_rows if self.conn else self.spill_rows):
+            self._spill()
+
+    def _spill(self):
+        if self.conn is None:
+            self.conn = sqlite3.connect('')  # 空文件名：SQLite 私有的磁盘临时库
+            # 用完整个丢掉即可：不要日志和落盘同步
+            self.conn.execute('PRAGMA journal_mode=OFF')
+            self.conn.execute('PRAGMA synchronous=OFF')
+            self.conn.execute(f"CREATE TABLE rows ({', '.join(f'c{i}' for i in range(self.width))})")
+        self.conn.executemany(f"INSERT INTO rows VALUES ({', '.join('?' * self.width)})", self.pending)
+        self.conn.commit()
+        self.stored += len(self.pending)
+        self.pending = []
+
+    def rows(self, start=0, end=None):
+        """按顺序逐行取 [start, end)；已写盘的部分每次查一块（行是 tuple），其余直接取内存里的 list"""
+        end = len(self) if end is None else min(end, len(self))
+        pos = start
+        while pos < min(end, self.stored):
+            chunk_end = min(pos + self.chunk_rows, end, self.stored)
+            yield from self.conn.execute('SELECT * FROM rows WHERE rowid > ? AND rowid <= ? ORDER BY rowid', (pos, chunk_end))
+            pos = chunk_end
+        if end > self.stored:
+            yield from itertools.islice(self.pending, max(start - self.stored, 0), end - self.stored)
+
+    def __iter__(self):
+        return self.rows()
+
+    def __getitem__(self, index):
+        """只支持切片（拆分写出时取一个分片），返回 list"""
+        start, end, _ = index.indices(len(self))
+        return list(self.rows(start, end))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+        self.pending = []
+        self.stored = 0
+
+
+def text_cell(value):
+    """文本输出的单元格：空值写空串，整数值的 float 写成整数（与 Excel 里看到的一致）"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if value != value:
+            return ''
+        if value.is_integer():
+            return int(value)
+    return value
+
+
+def write_delimited(stream, columns, rows, delimiter):
+    """把一个 sheet 的行直接写成文本表格（不建 DataFrame/工作簿），stream 为二进制流。
+    CSV 带 BOM 方便 Excel 直接打开中文列头，TSV 用纯 UTF-8"""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig' if delimiter == ',' else 'utf-8', newline='')
+    writer = csv.writer(text, delimiter=delimiter, lineterminator='\n')
+    writer.writerow(columns)
+    writer.writerows([text_cell(v) for v in row] for row in rows)
+    text.flush()
+    text.detach()  # 不关闭底层的字节流
+
+
+def header_cell(ws, value):
+    cell = WriteOnlyCell(ws, value)
+    cell.font, cell.border, cell.alignment = HEADER_FONT, HEADER_BORDER, HEADER_ALIGNMENT
+    return cell
+
+
+def write_xlsx(stream, sheets):
+    """openpyxl 只写模式逐行写出多 Sheet 工作簿（行数多时内存不随行数增长）；
+    单元格与原来 DataFrame.to_excel(index=False) 写出的相同：第一行列头（带列头样式），之后每行一条，空值写空串"""
+    wb = openpyxl.Workbook(write_only=True)
+    for sheet_name, columns, rows in sheets:
+        ws = wb.create_sheet(sheet_name)
+        ws.append([header_cell(ws, column) for column in columns])
+        for row in rows:
+            ws.append(['' if v is None or v != v else v for v in row])
+    wb.save(stream)
+
+
+def write_header_output(sheets, output_format):
+    """sheets: [(sheet 名, 列头, 行)]，只写有数据的 sheet；返回 (输出字节流, 文件后缀)。
+    行可以是 list 或 RowBuffer。Excel 格式写成多 Sheet 工作簿；TSV/CSV 每个 sheet 一个文件，两个都有数据时打包成 zip"""
+    sheets = [(sheet_name, columns, rows) for sheet_name, columns, rows in sheets if rows]
+    delimiter = OUTPUT_FORMATS[output_format][1]
+    output_buffer = io.BytesIO()
+    if delimiter is None:
+        write_xlsx(output_buffer, sheets)
+        suffix = 'xlsx'
+    elif len(sheets) > 1:
+        with zipfile.ZipFile(output_buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for sheet_name, columns, rows in sheets:
+                with zf.open(f'{sheet_name}.{output_format}', 'w') as member:
+                    write_delimited(member, columns, rows, delimiter)
+        suffix = 'zip'
+    else:
+        for sheet_name, columns, rows in sheets:
+            write_delimited(output_buffer, columns, rows, delimiter)
+        suffix = output_format
+    output_buffer.seek(0)
+    return output_buffer, suffix
+
+
+# ======== 大文件拆分 ========
+
+def row_bytes(row):
+    """一行写成 TSV 后的 UTF-8 字节数（含换行），用来估算分片大小；xlsx 压缩后通常更小，按这个估算偏保守"""
+    return len('\t'.join(str(text_cell(v)) for v in row).encode('utf-8')) + 1
+
+
+def iter_campaign_blocks(rows, measure=False):
+    """顺序扫一遍行，按广告活动编号切成连续的块：逐个给出 (起始行, 结束行, 字节数)；measure 为 False 时字节数记 0。
+    只顺序读，RowBuffer 转存到文件的行也只读一遍"""
+    start = size = 0
+    current = None
+    i = -1
+    for i, row in enumerate(rows):
+        if i and row[CAMPAIGN_ID_COL] != current:
+            yield start, i, size
+            start, size = i, 0
+        current = row[CAMPAIGN_ID_COL]
+        if measure:
+            size += row_bytes(row)
+    if i >= 0:
+        yield start, i + 1, size
+
+
+def campaign_blocks(rows):
+    """按广告活动编号把行切成连续的块：[(起始行, 结束行)]"""
+    return [(start, end) for start, end, _ in iter_campaign_blocks(rows)]
+
+
+def plan_shards(columns, rows, max_rows=0, max_bytes=0):
+    """按活动块依次装进分片，当前分片放不下就开新分片，返回 [(起始行, 结束行)]。
+    max_rows/max_bytes 为 0 表示不限；单个活动超过预算时独占一个分片（活动不会被拆到两个文件里）"""
+    header_bytes = row_bytes(columns)
+    shards = []
+    shard_start = shard_end = 0
+    shard_bytes = header_bytes
+    for start, end, size in iter_campaign_blocks(rows, bool(max_bytes)):
+        over_rows = max_rows and shard_end - shard_start + end - start > max_rows
+        over_bytes = max_bytes and shard_bytes + size > max_bytes
+        if shard_end > shard_start and (over_rows or over_bytes):
+            shards.append((shard_start, shard_end))
+            shard_start = start
+            shard_bytes = header_bytes
+        shard_end = end
+        shard_bytes += size
+    if shard_end > shard_start:
+        shards.append((shard_start, shard_end))
+    return shards
+
+
+def _write_shard(sheet_name, columns, rows, output_format):
+    """写一个分片文件（单个 sheet），返回文件字节；放在模块顶层，子进程才能按名字找到"""
+    return write_header_output([(sheet_name, columns, rows)], output_format)[0].getvalue()
+
+
+def _shard_executor(output_format, workers):
+    """xlsx 写出是纯 Python 的 CPU 计算，用子进程才能并行（spawn：不从多线程的服务进程 fork）；
+    TSV/CSV 写得很快，线程就够了，省掉子进程启动和传数据的开销"""
+    if OUTPUT_FORMATS[output_format][1] is None:
+        return concurrent.futures.ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))
+    return concurrent.futures.ThreadPoolExecutor(workers)
+
+
+def write_sharded_output(sheets, output_format, max_rows=0, max_bytes=0, workers=SHARD_WRITE_WORKERS):
+    """按预算拆分后并行写出，打包成 zip 并附 manifest.json；返回 (输出字节流, 文件后缀)。
+    没有哪个 sheet 需要拆时不打包，与 write_header_output 的结果相同"""
+    sheets = [(sheet_name, columns, rows) for sheet_name, columns, rows in sheets if rows]
+    planned = [(sheet_name, columns, rows, plan_shards(columns, rows, max_rows, max_bytes))
+               for sheet_name, columns, rows in sheets]
+    if all(len(shards) == 1 for *_, shards in planned):
+        return write_header_output(sheets, output_format)
+
+    # 分片按顺序提交，最多 workers 个在写；写完一个就放进 zip，内存里只有正在写的分片
+    entries = []
+    output_buffer = io.BytesIO()
+    # xlsx 本身已经是压缩包，再压缩没有意义
+    compression = zipfile.ZIP_STORED if output_format == 'xlsx' else zipfile.ZIP_DEFLATED
+    zf = zipfile.ZipFile(output_buffer, 'w', compression)
+    in_flight = collections.deque()
+
+    def finish_one():
+        entry, future = in_flight.popleft()
+        data = future.result()
+        zf.writestr(entry['file'], data)
+        entry['bytes'] = len(data)
+
+    with _shard_executor(output_format, workers) as executor:
+        for sheet_name, columns, rows, shards in planned:
+            for n, (start, end) in enumerate(shards, 1):
+                part = rows[start:end]
+                entry = {
+                    'file': f'{sheet_name}-{n:03d}.{output_format}',
+                    'sheet': sheet_name,
+                    'rows': end - start,
+                    'campaigns': len(campaign_blocks(part)),
+                    'first_campaign': part[0][CAMPAIGN_ID_COL],
+                    'last_campaign': part[-1][CAMPAIGN_ID_COL],
+                }
+                entries.append(entry)
+                in_flight.append((entry, executor.submit(_write_shard, sheet_name, columns, part, output_format)))
+                del part
+                if len(in_flight) >= workers:
+                    finish_one()
+        while in_flight:
+            finish_one()
+
+    manifest = {
+        'generated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'format': output_format,
+        'max_rows': max_rows,
+        'max_bytes': max_bytes,
+        'total_rows': {sheet_name: len(rows) for sheet_name, _, rows in sheets},
+        'files': entries,
+    }
+    with zf:
+        zf.writestr('manifest.json', json.dumps(manifest, ensure_ascii=False, indent=2, default=str))
+    output_buffer.seek(0)
+    return output_buffer, 'zip'
@@ -0,0 +1,273 @@
+"""跨会话共享的任务池：限制同时运行的重任务数，按用户轮转排队，超额直接拒绝。
+
+不依赖 streamlit，可以单独运行做本地负载模拟：
+    python job_pool.py --sessions 30 --max-running 2
+"""
+import argparse
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+
+class JobCancelled(Exception):
+    """任务被取消（排队中直接撤销，运行中在下一个检查点中止）"""
+
+
+class PoolRejected(Exception):
+    """准入控制拒绝：该用户排队/运行中的任务已达上限，或总队列已满"""
+
+
+class Job:
+    """池中的一个任务：状态、进度、取消标记和结果"""
+    QUEUED, RUNNING, DONE = 'queued', 'running', 'done'
+
+    def __init__(self, pool, user, label, fn=None, info=None):
+        self.pool = pool
+        self.user = user
+        self.label = label
+        self.fn = fn              # 后台任务：fn(job)；同步名额（slot）为 None
+        self.info = info or {}    # 调用方附带的信息（例如上传文件哈希、日志记录器）
+        self.submitted_at = datetime.now()
+        self.state = Job.QUEUED
+        self.progress = 0.0
+        self.text = "排队中..."
+        self._cancel_event = threading.Event()
+        self._granted = threading.Event()
+        self._finished = threading.Event()
+        self._result = None
+        self._exception = None
+
+    def update(self, progress, text):
+        """任务内部调用：更新进度，已取消则抛出 JobCancelled"""
+        self.progress, self.text = progress, text
+        if self._cancel_event.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel_event.set()
+        self.pool._withdraw(self)  # 还在排队时直接移出队列
+
+    @property
+    def cancelled(self):
+        return isinstance(self._exception, JobCancelled)
+
+    def position(self):
+        """排队位置（1 表示下一个运行），不在排队中返回 0"""
+        return self.pool.position(self)
+
+    def done(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def exception(self):
+        self._finished.wait()
+        return self._exception
+
+    def result(self):
+        self._finished.wait()
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+
+class JobPool:
+    """有界任务池。
+    - 同时运行的任务不超过 max_running（后台任务和同步名额一起算）
+    - 每个用户排队+运行中的任务不超过 max_per_user，总排队数不超过 max_queued，超出时 PoolRejected
+    - 排队按用户轮转：每个用户各出一个任务轮流运行，提交多的用户不会挤占别人"""
+
+    def __init__(self, max_running=2, max_per_user=2, max_queued=30):
+        self.max_running = max_running
+        self.max_per_user = max_per_user
+        self.max_queued = max_queued
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()  # 用户 -> 排队任务；键的顺序就是轮转顺序
+        self._running = set()
+
+    def submit(self, user, label, fn, info=None):
+        """提交后台任务，在池线程里执行 fn(job)，立即返回 Job"""
+        job = Job(self, user, label, fn, info)
+        self._enqueue(job)
+        return job
+
+    @contextmanager
+    def slot(self, user, label, on_wait=None, poll=0.5):
+        """在调用方线程里占用一个运行名额（用于没法放到后台的处理）。
+        排队时每 poll 秒回调 on_wait(排队位置)；with 块结束（包括异常）时释放名额"""
+        job = Job(self, user, label)
+        self._enqueue(job)
+        try:
+            while not job._granted.wait(poll):
+                if on_wait is not None:
+                    on_wait(job.position())
+            yield job
+        finally:
+            if not self._withdraw(job):
+                self._finish(job)
+
+    def position(self, job):
+        with self._lock:
+            queue = self._queues.get(job.user)
+            if job.state != Job.QUEUED or queue is None or job not in queue:
+                return 0
+            idx = queue.index(job)
+            users = list(self._queues)
+            # 按轮转顺序展开：前面 idx 轮里每个用户各出一个，再加本轮排在该用户前面的
+            ahead = sum(min(len(self._queues[u]), idx) for u in users)
+            ahead += sum(1 for u in users[:users.index(job.user)] if len(self._queues[u]) > idx)
+            return ahead + 1
+
+    def status(self):
+        """当前快照：运行中的 (用户, 任务) 和每个用户的排队数"""
+        with self._lock:
+            return {
+                'running': [(job.user, job.label) for job in self._running],
+                'queued': {user: len(queue) for user, queue in self._queues.items()},
+            }
+
+    def _enqueue(self, job):
+        with self._lock:
+            pending = len(self._queues.get(job.user, ())) + sum(1 for j in self._running if j.user == job.user)
+            if pending >= self.max_per_user:
+                raise PoolRejected(f"你已有 {pending} 个任务在排队或运行，请等待完成后再提交")
+            if sum(len(q) for q in self._queues.values()) >= self.max_queued:
+                raise PoolRejected("服务器繁忙，排队任务已满，请稍后再试")
+            self._queues.setdefault(job.user, deque()).append(job)
+            self._dispatch()
+
+    def _dispatch(self):
+        """（持锁调用）按用户轮转把空出来的名额分给排队任务"""
+        while len(self._running) < self.max_running and self._queues:
+            user, queue = next(iter(self._queues.items()))
+            job = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user)
+            else:
+                del self._queues[user]
+            job.state = Job.RUNNING
+            self._running.add(job)
+            job._granted.set()
+            if job.fn is not None:
+                threading.Thread(target=self._run, args=(job,), name=f'job-pool-{job.label}', daemon=True).start()
+
+    def _run(self, job):
+        try:
+            job._result = job.fn(job)
+        except BaseException as e:
+            job._exception = e
+        finally:
+            self._finish(job)
+
+    def _finish(self, job):
+        with self._lock:
+            self._running.discard(job)
+            job.state = Job.DONE
+            job._finished.set()
+            self._dispatch()
+
+    def _withdraw(self, job):
+        """排队中的任务移出队列并标记为取消；已开始运行返回 False"""
+        with self._lock:
+            queue = self._queues.get(job.user)
+            if job.state != Job.QUEUED or queue is None or job not in queue:
+                return False
+            queue.remove(job)
+            if not queue:
+                del self._queues[job.user]
+            job._exception = JobCancelled()
+            job.state = Job.DONE
+            job._finished.set()
+            return True
+
+
+def simulate_load(sessions=30, jobs_per_session=3, job_seconds=0.2, max_running=2, max_per_user=2, max_queued=30,
+                  cancel_every=7, seed=0):
+    """模拟 sessions 个会话同时提交任务（一半走后台 submit，一半走同步 slot），返回统计结果"""
+    pool = JobPool(max_running, max_per_user, max_queued)
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats = {'running': 0, 'peak_running': 0, 'completed': 0, 'rejected': 0, 'cancelled': 0,
+             'waits': [], 'max_position': 0, 'start_order': []}
+
+    def work(job):
+        with lock:
+            stats['running'] += 1
+            stats['peak_running'] = max(stats['peak_running'], stats['running'])
+            stats['waits'].append((datetime.now() - job.submitted_at).total_seconds())
+            stats['start_order'].append(job.user)
+        try:
+            steps = 4
+            for step in range(steps):
+                job.update(step / steps, f"step {step}")
+                time.sleep(job_seconds / steps)
+        finally:
+            with lock:
+                stats['running'] -= 1
+
+    def session(n):
+        user = f'user-{n:02d}'
+        time.sleep(rng.random() * job_seconds)  # 各会话错开一点到达
+        jobs = []
+        for j in range(jobs_per_session):
+            try:
+                if n % 2:
+                    with pool.slot(user, f'{user}-{j}', poll=0.01) as job:
+                        work(job)
+                    with lock:
+                        stats['completed'] += 1
+                else:
+                    jobs.append(pool.submit(user, f'{user}-{j}', work))
+            except PoolRejected:
+                with lock:
+                    stats['rejected'] += 1
+        for i, job in enumerate(jobs):
+            with lock:
+                stats['max_position'] = max(stats['max_position'], job.position())
+            if cancel_every and (n + i) % cancel_every == 0:
+                job.cancel()
+        for job in jobs:
+            job.wait()
+            with lock:
+                stats['cancelled' if job.cancelled else 'completed'] += 1
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(sessions)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    stats['elapsed'] = time.perf_counter() - started
+    waits = stats.pop('waits')
+    stats['avg_wait'] = sum(waits) / len(waits) if waits else 0.0
+    stats['max_wait'] = max(waits, default=0.0)
+    stats.pop('running')
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务池本地负载模拟")
+    parser.add_argument('--sessions', type=int, default=30)
+    parser.add_argument('--jobs-per-session', type=int, default=3)
+    parser.add_argument('--job-seconds', type=float, default=0.2)
+    parser.add_argument('--max-running', type=int, default=2)
+    parser.add_argument('--max-per-user', type=int, default=2)
+    parser.add_argument('--max-queued', type=int, default=30)
+    args = parser.parse_args()
+
+    stats = simulate_load(args.sessions, args.jobs_per_session, args.job_seconds,
+                          args.max_running, args.max_per_user, args.max_queued)
+    order = stats.pop('start_order')
+    for key, value in stats.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    print(f"first 10 starts: {order[:10]}")
+    if stats['peak_running'] > args.max_running:
+        raise SystemExit(f"peak_running {stats['peak_running']} exceeds max_running {args.max_running}")
+
+
+if __name__ == '__main__':
+    main()
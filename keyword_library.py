@@ -0,0 +1,118 @@
+"""关键词库：跨次上传去重用的本地持久词库（SQLite）。
+
+词存在以词为主键的 WITHOUT ROWID 表里（B 树索引），几千万个词时单个查询仍是几次页读取；
+一批词先写进临时表，再用一条 JOIN 找出词库里没有的，查和写在同一个事务里完成：
+两个人同时提交时不会把同一个词都当成新词，中途出错时词库保持原样。
+词库文件只能由本服务读写：目录按 0700 创建、文件按 0600 创建；文件是符号链接、不属于当前用户或其他用户可写时拒绝打开。
+
+对比词库大小和批量查询耗时：
+    python keyword_library.py 词库.sqlite3 [词库词数] [每批词数]
+"""
+import os
+import sqlite3
+import stat
+import sys
+import time
+from datetime import datetime
+
+BUSY_TIMEOUT = 30  # 秒：另一个提交正在写词库时等待
+
+
+class UntrustedLibrary(Exception):
+    """词库文件或目录可能被其他用户替换或改写"""
+
+
+class KeywordLibrary:
+    """一个 SQLite 文件；每次操作单独开连接（streamlit 每个会话在自己的线程里跑）"""
+
+    def __init__(self, path):
+        self.path = path
+
+    def _check_private(self):
+        """目录、词库文件和 SQLite 的 -wal / -shm 文件都要属于当前用户且其他用户不可写；文件不能是符号链接"""
+        if not hasattr(os, 'getuid'):
+            return
+        for path in (os.path.dirname(self.path) or '.', self.path, self.path + '-wal', self.path + '-shm'):
+            try:
+                info = os.lstat(path)
+            except FileNotFoundError:
+                continue
+            if (stat.S_ISLNK(info.st_mode) or info.st_uid != os.getuid()
+                    or info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+                raise UntrustedLibrary(f"{path} 不属于当前用户、其他用户可写或是符号链接，拒绝使用")
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._check_private()
+        try:
+            os.close(os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_NOFOLLOW', 0), 0o600))
+        except FileExistsError:
+            pass
+        conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')  # 写入时不挡住其他会话读
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('CREATE TABLE IF NOT EXISTS keywords (keyword TEXT PRIMARY KEY, added_at TEXT NOT NULL) WITHOUT ROWID')
+        # 词数单独记一行，随写入在同一事务里更新（几千万个词时 COUNT(*) 要扫整张表）
+        conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        if conn.execute("SELECT 1 FROM meta WHERE name = 'count'").fetchone() is None:
+            conn.execute("INSERT OR IGNORE INTO meta VALUES ('count', (SELECT COUNT(*) FROM keywords))")
+        return conn
+
+    def count(self):
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT value FROM meta WHERE name = 'count'").fetchone()[0]
+        finally:
+            conn.close()
+
+    def new_keywords(self, keywords, record=True):
+        """返回 keywords 中词库里没有的词（按原顺序、去重）；record 为 True 时在同一个事务里把它们记入词库"""
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE' if record else 'BEGIN')
+            try:
+                conn.execute('CREATE TEMP TABLE IF NOT EXISTS batch (pos INTEGER PRIMARY KEY, keyword TEXT NOT NULL)')
+                conn.execute('DELETE FROM batch')
+                conn.executemany('INSERT INTO batch (keyword) VALUES (?)', ((k,) for k in keywords))
+                # 批内重复的词只取第一次出现
+                unseen = [row[0] for row in conn.execute(
+                    'SELECT b.keyword FROM batch b LEFT JOIN keywords k ON k.keyword = b.keyword '
+                    'WHERE k.keyword IS NULL GROUP BY b.keyword ORDER BY MIN(b.pos)')]
+                if record and unseen:
+                    added = conn.execute('INSERT OR IGNORE INTO keywords (keyword, added_at) SELECT keyword, ? FROM batch',
+                                         (datetime.now().strftime('%Y-%m-%d %H:%M:%S'),)).rowcount
+                    conn.execute("UPDATE meta SET value = value + ? WHERE name = 'count'", (added,))
+                conn.execute('DROP TABLE batch')
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            return unseen
+        finally:
+            conn.close()
+
+
+def main():
+    path = sys.argv[1]
+    library_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 100_000
+    library = KeywordLibrary(path)
+
+    existing = library.count()
+    if existing < library_size:
+        started = time.perf_counter()
+        for start in range(existing, library_size, 1_000_000):
+            library.new_keywords(f'kw{i:09d}' for i in range(start, min(start + 1_000_000, library_size)))
+        print(f"填充词库到 {library_size} 个词：{time.perf_counter() - started:.1f}s")
+    # 一半已在词库里，一半是新词
+    batch = [f'kw{i:09d}' for i in range(library_size - batch_size // 2, library_size + batch_size - batch_size // 2)]
+    started = time.perf_counter()
+    unseen = library.new_keywords(batch, record=False)
+    print(f"查询 {batch_size} 个词：{time.perf_counter() - started:.2f}s，新词 {len(unseen)} 个，"
+          f"词库 {library.count()} 个词，文件 {os.path.getsize(path) / 2**20:.0f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""关键词拆分：从表格里提取单词（保留连字符词组）并去重，可选按词形归一合并变体。
+
+不依赖 streamlit：多个文件在子进程里各自读取、拆分成词频计数，再在主进程合并，
+结果与逐个文件处理后合并相同（只读每个文件的第一个工作表，列名也参与拆分）。
+归一（全角/半角、单复数、拼写变体）在合并后对去重后的词做，每个词的折叠写法和候选单数有 LRU 缓存。
+
+对比逐个处理和并行处理的耗时：
+    python keyword_split.py 报表1.xlsx 报表2.xlsx ...
+"""
+import concurrent.futures
+import functools
+import io
+import json
+import multiprocessing
+import os
+import re
+import sys
+import time
+import unicodedata
+from collections import Counter
+
+import pandas as pd
+
+from xlsx_stream import read_sheet_frame
+
+STOP_WORDS = {'for', 'with', 'the', 'a', 'an', 'and', 'or', 'of', 'to'}
+HYPHENATED_PATTERN = re.compile(r'\b\w+(?:-\w+)+\b')  # 规则 A: 连字符词组（如 6-in-1）
+WORD_PATTERN = re.compile(r'\b\w+\b')                  # 规则 B: 独立单词
+INGEST_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def extract_words(text, words):
+    """把一个单元格（或列名）里的词计入 words（Counter）"""
+    text = str(text).lower()
+    words.update(HYPHENATED_PATTERN.findall(text))
+    words.update([w for w in WORD_PATTERN.findall(text) if w not in STOP_WORDS])
+
+
+def read_keyword_frame(name, data):
+    """第一个工作表读成 DataFrame（第 1 行作列名）；xlsx 用流式读取，其它格式交给 pandas"""
+    if name.lower().endswith('.xlsx'):
+        return read_sheet_frame(data)
+    return pd.read_excel(io.BytesIO(data))
+
+
+def frame_words(df):
+    """一个表格里的所有词及出现次数：列名 + 每列非空单元格"""
+    words = Counter()
+    for col in df.columns:
+        extract_words(col, words)
+        for item in df[col].dropna():
+            extract_words(item, words)
+    return words
+
+
+def file_words(name, data):
+    """在子进程里处理一个文件：返回 (词频, 出错原因)；放在模块顶层，子进程才能按名字找到"""
+    try:
+        return frame_words(read_keyword_frame(name, data)), None
+    except Exception as e:
+        return Counter(), str(e) or type(e).__name__
+
+
+def split_keyword_files(files, workers=INGEST_WORKERS):
+    """files: [(文件名, 字节)]。每个文件在子进程里拆成词频后合并（spawn：不从多线程的服务进程 fork）；
+    只有一个文件时直接在当前进程处理，省掉子进程启动。
+    返回 (合并后的词频 Counter, [(文件名, 词数, 出错原因)])；sorted(词频) 即去重后的词表"""
+    if len(files) == 1 or workers <= 1:
+        results = [file_words(name, data) for name, data in files]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(min(workers, len(files)),
+                                                    mp_context=multiprocessing.get_context('spawn')) as executor:
+            results = list(executor.map(file_words, [name for name, _ in files], [data for _, data in files]))
+    all_words = Counter()
+    stats = []
+    for (name, _), (words, error) in zip(files, results):
+        all_words.update(words)
+        stats.append((name, len(words), error))
+    return all_words, stats
+
+
+# ======== 词形归一：全角/半角、单复数、拼写变体 ========
+# 去掉结尾 s 后会变成另一个常用词的，不做单复数合并
+SINGULAR_KEEP = {'news', 'glasses', 'shorts', 'pants', 'goods', 'series', 'species', 'means', 'lens', 'canvas', 'christmas'}
+# 拼写变体 -> 统一写法（两边都按归一规则处理后比较，写原词即可）
+DEFAULT_VARIANTS = {'colour': 'color', 'grey': 'gray', 'aluminium': 'aluminum'}
+
+
+class KeywordNormalizer:
+    """词 -> 归一键：NFKC（全角转半角等）+ 小写、去连字符（usb-c / usbc）、复数还原、拼写变体表。
+    复数只并到同一批里出现过的单数：cookies 的候选单数是 cooky / cookie，哪个出现过就并到哪个，
+    都没出现过时保持原样（没有可合并的词）。forms 带 LRU 缓存，重复的词只是一次字典查找"""
+
+    def __init__(self, variants=None, keep=(), cache_size=2 ** 20):
+        self.keep = SINGULAR_KEEP | {w.lower() for w in keep}
+        self.variants = {}
+        for word, canonical in {**DEFAULT_VARIANTS, **(variants or {})}.items():
+            self.variants[self._fold(word)] = self._fold(canonical)
+        self.forms = functools.lru_cache(maxsize=cache_size)(self._forms)
+
+    @classmethod
+    def from_file(cls, path=None):
+        """JSON 配置：{"variants": {"变体": "统一写法"}, "keep": ["不做单复数合并的词"]}；没有文件时只用内置规则"""
+        if not path:
+            return cls()
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('variants'), config.get('keep', ()))
+
+    def _singulars(self, word):
+        """可能的单数写法，按优先顺序；不是复数（或在 keep 里）时为空"""
+        if len(word) <= 3 or not (word.isascii() and word.isalpha()) or word in self.keep:
+            return ()
+        if word.endswith('ies') and len(word) > 4:
+            return word[:-3] + 'y', word[:-1]        # batteries -> battery, cookies -> cookie
+        if word.endswith(('sses', 'ches', 'shes', 'xes')):
+            return word[:-2], word[:-1]              # boxes -> box, headaches -> headache
+        if word.endswith('oes') and len(word) > 5:
+            return word[:-1], word[:-2]              # shoes -> shoe, potatoes -> potato
+        if word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+            return word[:-1],                        # cases -> case
+        return ()
+
+    @staticmethod
+    def _fold(word):
+        return unicodedata.normalize('NFKC', word).lower().replace('-', '')
+
+    def _forms(self, word):
+        """(折叠后的写法, 候选单数)"""
+        folded = self._fold(word)
+        return folded, self._singulars(folded)
+
+    def keys(self, words):
+        """一批词 -> {词: 归一键}。复数的候选单数在这批里出现过（含拼写变体统一后的写法）时并到该单数"""
+        forms = {word: self.forms(word) for word in words}
+        seen = {folded for folded, _ in forms.values()}
+        seen |= {self.variants[folded] for folded in seen if folded in self.variants}
+        keys = {}
+        for word, (folded, singulars) in forms.items():
+            key = next((s for s in singulars if s in seen), folded)
+            # 拼写变体：写法本身或它的单数在变体表里（colours -> colour -> color）
+            keys[word] = next((self.variants[f] for f in (key, *singulars) if f in self.variants), key)
+        return keys
+
+
+def group_variants(words, normalizer):
+    """按归一键合并：返回按关键词排序的 [(关键词, [合并掉的变体])]。
+    关键词取组里出现次数最多的写法（一样多时取短的），归一后是停用词的整组去掉"""
+    groups = {}
+    keys = normalizer.keys(words)
+    for word, count in words.items():
+        groups.setdefault(keys[word], []).append((word, count))
+    rows = []
+    for key, members in groups.items():
+        if key in STOP_WORDS:
+            continue
+        keyword = min(members, key=lambda m: (-m[1], len(m[0]), m[0]))[0]
+        rows.append((keyword, sorted(word for word, _ in members if word != keyword)))
+    rows.sort()
+    return rows
+
+
+def main():
+    files = []
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            files.append((os.path.basename(path), f.read()))
+
+    started = time.perf_counter()
+    serial, _ = split_keyword_files(files, workers=1)
+    t_serial = time.perf_counter() - started
+    started = time.perf_counter()
+    parallel, stats = split_keyword_files(files)
+    t_parallel = time.perf_counter() - started
+    for name, count, error in stats:
+        print(f"{name}: {count} 个词" + (f"，出错：{error}" if error else ""))
+    print(f"逐个处理: {t_serial:.2f}s；并行（{min(INGEST_WORKERS, len(files))} 个进程）: {t_parallel:.2f}s；"
+          f"合并后 {len(parallel)} 个词，结果相同: {serial == parallel}")
+    normalizer = KeywordNormalizer()
+    started = time.perf_counter()
+    rows = group_variants(parallel, normalizer)
+    t_cold = time.perf_counter() - started
+    started = time.perf_counter()
+    group_variants(parallel, normalizer)
+    print(f"词形归一后 {len(rows)} 个词：首次 {t_cold:.2f}s，缓存命中后 {time.perf_counter() - started:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""按内容哈希保存解析结果的磁盘快照。
+
+同一份上传文件（字节完全相同）再次处理时直接读快照，跳过解析工作簿。
+快照用 pickle 保存（模版里同一列常混着文本、数字和日期，列式格式存不下这种对象列而不改变取值），
+读 pickle 等于执行文件里的代码，所以目录只能由本服务读写：
+- 不指定目录时每个服务进程用 mkdtemp 建一个私有目录（0700），进程退出时删除，不跨重启保留；
+- 指定目录（服务重启后、多个服务进程之间复用）时按 0700 创建；目录或快照文件不属于当前用户、
+  或其他用户可写时不读也不写，退化为不缓存。
+"""
+import atexit
+import os
+import pickle
+import shutil
+import stat
+import tempfile
+import threading
+
+
+class SnapshotCache:
+    """目录里每个快照一个文件；超过 max_entries 时删除最久没用过的"""
+    SUFFIX = '.pkl'
+
+    def __init__(self, directory=None, max_entries=64):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+    def _directory(self):
+        """可信的快照目录，不可信时返回 None；私有临时目录第一次用到时才建"""
+        with self._lock:
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix='toolbox-snapshots-')
+                atexit.register(shutil.rmtree, self.directory, True)
+            else:
+                os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        try:
+            info = os.stat(self.directory)
+        except OSError:
+            return None
+        return self.directory if stat.S_ISDIR(info.st_mode) and _private(info) else None
+
+    def path(self, key):
+        return os.path.join(self.directory, key + SnapshotCache.SUFFIX)
+
+    def load(self, key):
+        """读取快照，没有、已损坏或文件不可信时返回 None（损坏的文件顺便删掉）"""
+        if self._directory() is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, 'rb') as f:
+                if not _private(os.fstat(f.fileno())):
+                    return None
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # 用修改时间记录最近使用，淘汰时按它排序
+        except OSError:
+            pass
+        return value
+
+    def save(self, key, value):
+        """先写临时文件再改名，并发写同一个键时读到的总是完整快照；目录不可信时不保存"""
+        if self._directory() is None:
+            return
+        path = self.path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')  # 0600
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        finally:
+            self._remove(tmp_path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SnapshotCache.SUFFIX):
+                try:
+                    entries.append((entry.stat().st_mtime, entry.path))
+                except OSError:
+                    pass
+        entries.sort()
+        for _, path in entries[:max(0, len(entries) - self.max_entries)]:
+            self._remove(path)
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _private(info):
+    """属于当前用户且组和其他用户不可写（没有用户 ID 的平台上只能信任目录本身）"""
+    if not hasattr(os, 'getuid'):
+        return True
+    return info.st_uid == os.getuid() and not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
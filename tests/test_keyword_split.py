@@ -0,0 +1,65 @@
+"""keyword_split 的词形归一：该合并的成对写法归到同一个键，刻意保留的不合并"""
+from collections import Counter
+
+import pytest
+
+from keyword_split import KeywordNormalizer, group_variants
+
+MERGED = [
+    ('cases', 'case'),
+    ('batteries', 'battery'),
+    ('cookies', 'cookie'),
+    ('movies', 'movie'),
+    ('boxes', 'box'),
+    ('watches', 'watch'),
+    ('brushes', 'brush'),
+    ('headaches', 'headache'),
+    ('niches', 'niche'),
+    ('shoes', 'shoe'),
+    ('potatoes', 'potato'),
+    ('usb-c', 'usbc'),
+    ('ＵＳＢ', 'usb'),
+    ('Cable', 'cable'),
+    ('colour', 'color'),
+    ('colours', 'color'),
+    ('colors', 'colour'),
+    ('greys', 'gray'),
+]
+
+KEPT = [
+    ('news', 'new'),
+    ('glasses', 'glass'),
+    ('shorts', 'short'),
+    ('pants', 'pant'),
+    ('toes', 'to'),
+    ('bus', 'bu'),
+    ('class', 'clas'),
+]
+
+
+@pytest.mark.parametrize('plural, singular', MERGED)
+def test_merged_pairs(plural, singular):
+    keys = KeywordNormalizer().keys([plural, singular])
+    assert keys[plural] == keys[singular]
+
+
+@pytest.mark.parametrize('first, second', KEPT)
+def test_kept_pairs(first, second):
+    keys = KeywordNormalizer().keys([first, second])
+    assert keys[first] != keys[second]
+
+
+def test_plural_without_singular_is_kept_as_is():
+    assert KeywordNormalizer().keys(['cookies']) == {'cookies': 'cookies'}
+
+
+def test_group_variants_uses_most_frequent_spelling():
+    rows = group_variants(Counter({'cookies': 5, 'cookie': 2, 'Cookie': 1, 'the': 9}), KeywordNormalizer())
+    assert rows == [('cookies', ['Cookie', 'cookie'])]
+
+
+def test_custom_keep_and_variants():
+    normalizer = KeywordNormalizer(variants={'favourite': 'favorite'}, keep=['Lens'])
+    keys = normalizer.keys(['favourites', 'favorite', 'lens', 'len'])
+    assert keys['favourites'] == keys['favorite']
+    assert keys['lens'] != keys['len']
@@ -0,0 +1,74 @@
+"""xlsx_patch 与 openpyxl 的一致性：同样的删行和写入，读到的单元格类型和保存后的值相同"""
+import io
+
+import openpyxl
+import pytest
+from openpyxl.cell.cell import MergedCell
+
+import xlsx_patch
+
+
+def template_bytes():
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    for row in range(1, 21):
+        for col in range(1, 5):
+            ws.cell(row, col).value = f'r{row}c{col}'
+    ws['D3'] = '=A3&B3'
+    for ref in ('A5:C5', 'A8:B13', 'B15:C16', 'D18:D19'):
+        ws.merge_cells(ref)
+    buf = io.BytesIO()
+    wb.save(buf)
+    return buf.getvalue()
+
+
+WRITES = [(row, col) for row in range(1, 12) for col in range(1, 6)]
+
+
+def delete_and_write(load, idx, amount):
+    wb = load(io.BytesIO(template_bytes()))
+    ws = wb.active
+    ws.delete_rows(idx, amount)
+    merged = {}
+    for row, col in WRITES:
+        cell = ws.cell(row=row, column=col)
+        merged[(row, col)] = isinstance(cell, MergedCell)
+        if not merged[(row, col)]:
+            cell.value = f'w{row}-{col}'
+    out = io.BytesIO()
+    wb.save(out)
+    saved = openpyxl.load_workbook(io.BytesIO(out.getvalue())).active
+    values = {(c.row, c.column): c.value for r in saved.iter_rows() for c in r if not isinstance(c, MergedCell)}
+    return merged, values, ws
+
+
+@pytest.mark.parametrize('idx, amount', [(2, 10), (4, 2), (9, 3), (1, 1), (6, 20)])
+def test_delete_rows_then_write_matches_openpyxl(idx, amount):
+    patch_merged, patch_values, _ = delete_and_write(xlsx_patch.load_workbook, idx, amount)
+    ref_merged, ref_values, _ = delete_and_write(openpyxl.load_workbook, idx, amount)
+    assert patch_merged == ref_merged
+    # 写入的值都保存下来（openpyxl 保存时不收缩合并区域，写进旧区域范围的值重新读取时会被丢掉，所以只查 xlsx_patch）
+    for key, merged in patch_merged.items():
+        if not merged:
+            assert patch_values.get(key) == f'w{key[0]}-{key[1]}', key
+    for key, value in ref_values.items():
+        if value is not None and key not in {k for k, m in patch_merged.items() if m}:
+            assert patch_values.get(key) == value, key
+
+
+def test_deleted_merge_is_writable():
+    wb = xlsx_patch.load_workbook(template_bytes())
+    ws = wb.active
+    ws.delete_rows(2, 10)
+    ws.cell(5, 2).value = 'x'
+    assert ws.cell(5, 2).value == 'x'
+
+
+def test_merged_cells_follow_deleted_rows():
+    _, _, ws = delete_and_write(xlsx_patch.load_workbook, 2, 10)
+    # A5:C5 删掉；A8:B13 只剩第 12、13 行 -> A2:B3；下面的区域上移 10 行
+    assert sorted(r.coord for r in ws.merged_cells.ranges) == ['A2:B3', 'B5:C6', 'D8:D9']
+    out = io.BytesIO()
+    ws.parent.save(out)
+    saved = openpyxl.load_workbook(io.BytesIO(out.getvalue())).active
+    assert sorted(r.coord for r in saved.merged_cells.ranges) == ['A2:B3', 'B5:C6', 'D8:D9']
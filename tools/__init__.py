@@ -0,0 +1 @@
+"""工具页面：每个工具一个模块，提供 render()，由 app.py 按侧边栏选择懒加载"""
@@ -0,0 +1,192 @@
+"""外箱贴自动化工具：按发货计划表填写 FBA 发货模板和装箱信息表"""
+import os
+
+import pandas as pd
+import streamlit as st
+from datetime import datetime
+
+from carton_fill import (
+    DEFAULT_CARRIER, box_allocation, box_totals, check_box_sequence, extract_box_info, extract_plan_data,
+    fba_upload_text, fill_fba_template, fill_packing_list, load_carrier_profiles, match_shipments, run_batch,
+)
+from tools.common import heavy_job_slot
+from xlsx_stream import read_sheet_frame
+
+# ======== 承运商默认箱规（内置海运，可用 JSON 文件追加/覆盖） ========
+CARRIER_PROFILE_FILE = os.environ.get('TOOLBOX_CARRIER_PROFILES')
+
+@st.cache_resource(show_spinner=False)
+def carrier_profiles():
+    """打开外箱贴页面时才读取箱规文件，整个服务进程共用一份"""
+    return load_carrier_profiles(CARRIER_PROFILE_FILE)
+
+def carrier_profile_choice(key):
+    """默认箱规有多套时让用户选，只有内置的一套时不显示"""
+    profiles = carrier_profiles()
+    if len(profiles) == 1:
+        return next(iter(profiles.values()))
+    names = list(profiles)
+    name = st.selectbox("默认箱规（海运，或计划表里没有箱规的箱子）", names,
+                        index=names.index(DEFAULT_CARRIER) if DEFAULT_CARRIER in names else 0, key=key)
+    return profiles[name]
+
+def render_batch():
+    """批量模式：多个货件的计划表/模版一次上传，并行处理后打包成一个 zip"""
+    st.subheader("批量处理多个货件")
+    st.caption("按文件名配对：文件名含货件编号（FBA 开头）时按编号配对，否则按去掉“发货计划表/SKU空白模版/包装箱表”等字样后的文件名配对，"
+               "例如 “A01-发货计划表.xlsx” 与 “A01-SKU空白模版.xlsx”。只上传一个 SKU 空白模版时所有货件共用。")
+    plan_files = st.file_uploader("1. 上传多个《发货计划表》", type=["xlsx"], accept_multiple_files=True, key="batch_plans")
+    fba_template_files = st.file_uploader("2. 上传《SKU空白模版》（一个共用，或每个货件一个）", type=["xlsx"],
+                                          accept_multiple_files=True, key="batch_templates")
+    cus_template_files = st.file_uploader("3. （可选）上传从亚马逊下载的《包装箱表》", type=["xlsx"],
+                                          accept_multiple_files=True, key="batch_packing")
+    ship_mode = st.radio("选择配送方式", ["海运 (默认重量和尺寸)", "快递 (按实际填写)"], horizontal=True, key="batch_ship_mode")
+    profile = carrier_profile_choice("batch_carrier_profile")
+
+    if plan_files and fba_template_files and st.button("开始批量处理"):
+        shipments, unmatched = match_shipments(
+            [(f.name, f.getvalue()) for f in plan_files],
+            [(f.name, f.getvalue()) for f in fba_template_files],
+            [(f.name, f.getvalue()) for f in cus_template_files or []])
+        for name in unmatched:
+            st.warning(f"⚠️ {name} 没有对应的发货计划表，已忽略")
+        # 整批占用一个任务池名额，批内按货件并行
+        with heavy_job_slot("外箱贴：批量处理"), st.spinner(f"正在处理 {len(shipments)} 个货件..."):
+            zip_bytes, reports = run_batch(shipments, "快递" in ship_mode, profile)
+        st.session_state.carton_batch = (zip_bytes, reports, datetime.now().strftime("%Y-%m-%d %H:%M"))
+
+    # 结果按会话保留：点下载按钮触发的重跑不会丢失
+    if st.session_state.get("carton_batch"):
+        zip_bytes, reports, finished_at = st.session_state.carton_batch
+        failed = sum(1 for r in reports if r['状态'] != '成功')
+        if failed:
+            st.error(f"❌ {failed} 个货件处理失败，原因见下表（成功的货件已打包）")
+        else:
+            st.success(f"✅ {len(reports)} 个货件全部处理完成！")
+        st.dataframe(reports, hide_index=True)
+        st.download_button("📥 下载全部结果 (zip)", zip_bytes, f"外箱贴批量-{finished_at}.zip", mime="application/zip")
+
+    st.stop()
+
+def render():
+    st.title("📦 Amazon 外箱贴自动化工具")
+    
+    with st.expander("📖 点击查看功能说明与操作指南", expanded=False):
+        st.markdown("""
+        ### 🌟 功能简介
+        本工具专门用于自动化填充亚马逊发货所需的两类表格：
+        1. **FBA 发货模板**：自动从计划表中提取 SKU 和数量，解决手动填表的低效与错误。
+        2. **装箱信息表**：自动分配分箱数量，并根据“快递”或“海运”模式自动填充外箱尺寸与重量。
+        3. **智能换算**：自动识别模板单位（如：磅、英寸），并根据计划表中的数据（KG、CM）进行高精度换算。
+
+        ### 🚀 使用步骤
+        * **第一步：生成 FBA 模板**
+            1. 分别上传《发货计划表》和亚马逊下载的《原始 SKU 空白模板》。
+            2. 点击按钮下载生成好的 FBA 模板，并将其上传至亚马逊后台。
+        * **第二步：生成装箱信息表**
+            1. 在亚马逊后台下载对应的《装箱信息表》。
+            2. 根据物流方式选择 **[快递]** 或 **[海运]**。
+            3. 上传下载好的装箱信息表。
+            4. 点击按钮下载最终的装箱表，检查无误后上传至亚马逊。
+        * **批量处理**：选择“批量处理多个货件”，一次上传多个计划表和模版，结果按货件分目录打包成一个 zip，附处理报告。
+        """)
+
+    if st.radio("处理方式", ["单个货件", "批量处理多个货件"], horizontal=True) == "批量处理多个货件":
+        render_batch()
+
+    if "plan_data" not in st.session_state:
+        st.session_state.plan_data = None
+
+    st.subheader("第一步：生成 FBA 发货模板")
+    c1, c2 = st.columns(2)
+    with c1:
+        plan_file = st.file_uploader("1. 上传《发货计划表》", type=["xlsx"])
+    with c2:
+        fba_template_file = st.file_uploader("2. 上传原始空白《SKU空白模版》", type=["xlsx"])
+
+    if plan_file and fba_template_file:
+        # 同一对上传文件只处理一次：读写工作簿时占用共享任务池名额（多人同时上传时排队），
+        # 结果存在 session_state，之后切换配送方式、箱规等控件引起的重跑直接展示，不再排队
+        step1_key = (plan_file.file_id, fba_template_file.file_id)
+        if st.session_state.get("carton_step1_key") != step1_key:
+            with heavy_job_slot("外箱贴：FBA 模板"):
+                # 计划表只读值：流式读取，不建 openpyxl 工作簿
+                raw_df = read_sheet_frame(plan_file)
+                st.session_state.box_info = extract_box_info(raw_df)
+                st.session_state.plan_data = extract_plan_data(raw_df)
+                # 箱号/数量只解析一次，校验和第二步填表共用
+                st.session_state.box_allocation = box_allocation(st.session_state.plan_data)
+                check = check_box_sequence(st.session_state.plan_data, st.session_state.box_info,
+                                           st.session_state.box_allocation)
+                fba_bytes = None
+                if check is None or not check[1]:  # 箱号不连续时不生成文件
+                    fba_bytes = fill_fba_template(fba_template_file, st.session_state.plan_data)
+                st.session_state.carton_step1 = (check, fba_bytes)
+            st.session_state.carton_step1_key = step1_key
+
+        check, fba_bytes = st.session_state.carton_step1
+        box_info = st.session_state.box_info
+        st.success(f"✅ 成功提取 {len(box_info)} 箱的尺寸和重量信息")
+
+        if check is not None:
+            max_b, missing_skus, missing_dims, qty_mismatch = check
+
+            if missing_skus:
+                st.error(f"❌ **逻辑错误：第 {missing_skus} 箱没有任何产品！**")
+                st.warning(f"检测到最大箱号为 {max_b}，但中间箱号分配不连续。系统已拦截文件生成。")
+                st.info("💡 请修改《发货计划表》确保箱号连续，然后重新上传。")
+                st.stop()
+
+            if missing_dims:
+                st.warning(f"⚠️ **数据缺失：箱号 {missing_dims} 缺少底部的重量尺寸信息！**")
+
+            if qty_mismatch:
+                st.warning(f"⚠️ **数量核对：{len(qty_mismatch)} 个 SKU 的各箱数量合计与实际发货数量不一致**")
+                st.dataframe(pd.DataFrame(qty_mismatch, columns=['店铺SKU', '实际发货数量', '各箱合计']),
+                             hide_index=True)
+
+            if not missing_skus and not missing_dims and max_b > 0:
+                st.success(f"✨ 交叉校验/分配通过：1 到 {max_b} 箱。")
+
+            totals = box_totals(st.session_state.box_allocation)
+            if not totals.empty:
+                with st.expander(f"每箱件数（共 {int(totals.sum())} 件）"):
+                    st.dataframe(totals.rename_axis('箱号').rename('件数').reset_index(), hide_index=True)
+
+        if fba_bytes is not None:
+            st.success("✅ FBA 模板处理完成！")
+            st.download_button("📥 下载填好的 FBA 模板", fba_bytes, "FBA_Filled.xlsx")
+
+            tsv_string = fba_upload_text(st.session_state.plan_data)
+        
+            st.download_button(
+                label="📄 下载 TXT 格式",
+                data=tsv_string,
+                file_name="FBA_Upload_Full.txt",
+                mime="text/plain"
+            )
+
+    if st.session_state.plan_data is not None:
+        st.divider() 
+        st.subheader("第二步：生成分箱包装信息表")
+        ship_mode = st.radio("选择配送方式", ["海运 (默认重量和尺寸)", "快递 (按实际填写)"], horizontal=True)
+        profile = carrier_profile_choice("carrier_profile")
+        cus_template_file = st.file_uploader("3. 上传从亚马逊下载的《包装箱表》", type=["xlsx"])
+
+        if cus_template_file:
+            # 输入（第一步的文件、包装箱表、配送方式、箱规）变了才重新填表并占用任务池名额
+            step2_key = (st.session_state.get("carton_step1_key"), cus_template_file.file_id, ship_mode,
+                         tuple(sorted(profile.items())))
+            if st.session_state.get("carton_step2_key") != step2_key:
+                with heavy_job_slot("外箱贴：装箱信息表"):
+                    st.session_state.carton_step2 = fill_packing_list(
+                        cus_template_file, st.session_state.plan_data, st.session_state.box_info,
+                        "快递" in ship_mode, st.session_state.get('box_allocation'), profile)
+                st.session_state.carton_step2_key = step2_key
+            filled = st.session_state.carton_step2
+            if filled is not None:
+                cus_bytes, actual_filled_boxes = filled
+                st.success(f"✅ 装箱信息表处理完成！已自动过滤空箱，实际填充 {actual_filled_boxes} 箱")
+                st.download_button("📥 下载填好的装箱信息表", cus_bytes, cus_template_file.name)
+
+    st.stop()  # 👈 【关键】这是外箱贴工具的刹车
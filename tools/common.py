@@ -0,0 +1,47 @@
+"""各工具页面共用的部分：共享任务池、会话用户、解析快照缓存"""
+import os
+import uuid
+from contextlib import contextmanager
+
+import streamlit as st
+
+from job_pool import JobPool, PoolRejected
+from snapshot_cache import SnapshotCache
+
+# ======== 共享任务池：三个工具的重任务都在这里排队，限制同时运行数 ========
+MAX_RUNNING_JOBS = int(os.environ.get('TOOLBOX_MAX_RUNNING_JOBS', 2))
+MAX_JOBS_PER_USER = int(os.environ.get('TOOLBOX_MAX_JOBS_PER_USER', 2))
+MAX_QUEUED_JOBS = int(os.environ.get('TOOLBOX_MAX_QUEUED_JOBS', 30))
+
+@st.cache_resource(show_spinner=False)
+def shared_job_pool():
+    """整个服务进程共用一个任务池（跨会话）"""
+    return JobPool(MAX_RUNNING_JOBS, MAX_JOBS_PER_USER, MAX_QUEUED_JOBS)
+
+def session_user():
+    """排队按用户轮转：有登录名用登录名，否则每个浏览器会话算一个用户"""
+    if 'pool_user' not in st.session_state:
+        st.session_state.pool_user = st.session_state.get('username') or uuid.uuid4().hex[:8]
+    return st.session_state.pool_user
+
+@contextmanager
+def heavy_job_slot(label):
+    """在脚本线程里占用任务池名额再处理；排队时显示排队位置，被拒绝时提示并停止"""
+    waiting = st.empty()
+    try:
+        with shared_job_pool().slot(session_user(), label,
+                                    on_wait=lambda pos: waiting.info(f"⏳ 服务器繁忙，{label}排队中：第 {pos} 位")) as job:
+            waiting.empty()
+            yield job
+    except PoolRejected as e:
+        waiting.empty()
+        st.error(f"🚫 {e}")
+        st.stop()
+
+# ======== 解析快照：同一份上传文件重复处理时跳过解析（按内容哈希存盘；指定目录时服务重启后仍可用，否则用进程私有临时目录） ========
+SNAPSHOT_DIR = os.environ.get('TOOLBOX_SNAPSHOT_DIR')
+SNAPSHOT_LIMIT = int(os.environ.get('TOOLBOX_SNAPSHOT_LIMIT', 64))
+snapshot_cache = SnapshotCache(SNAPSHOT_DIR, SNAPSHOT_LIMIT)
+
+# ======== Header 生成：输出行超过这个内存估算（MB）后转存到磁盘临时库，写出时流式读取 ========
+HEADER_SPILL_MB = float(os.environ.get('TOOLBOX_HEADER_SPILL_MB', 256))
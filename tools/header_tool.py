@@ -0,0 +1,1351 @@
+"""广告上传模版生成：从广告模版 Excel 生成品牌广告 / SP 的 Header 文件"""
+import streamlit as st
+import pandas as pd
+import numpy as np
+from collections import defaultdict
+import re
+import io
+import hashlib
+import zipfile
+from contextlib import ExitStack
+from openpyxl.utils import get_column_letter
+
+from header_output import OUTPUT_FORMATS, OUTPUT_MIME, RowBuffer, write_sharded_output
+from job_pool import PoolRejected
+from xlsx_stream import SheetNotFound, read_sheet_frame
+from tools.common import HEADER_SPILL_MB, shared_job_pool, session_user, snapshot_cache
+
+# ======== 表头索引：预编译的表头匹配规则 ========
+KEYWORD_COL_PATTERN = re.compile(r'精准词|广泛词|否')
+NEG_ASIN_COL_PATTERN = re.compile(r'否定asin', re.IGNORECASE)
+NEG_BRAND_COL_PATTERN = re.compile(r'否品牌', re.IGNORECASE)
+DUP_SUFFIX_PATTERN = re.compile(r'\.\d+$')  # pandas 给重名列追加的 .1 / .2 后缀
+
+# 否定关键词列：Excel 列字母 -> 表头列名
+NEG_KEYWORD_COLUMNS = {
+    'W': '宿主精准-否精准',
+    'X': '宿主精准-否词组',
+    'AA': '宿主广泛-否精准',
+    'AB': '宿主广泛-否词组',
+    'Y': 'case精准-否精准',
+    'Z': 'case精准-否词组',
+    'AC': 'case广泛-否精准',
+    'AD': 'case广泛-否词组',
+    'AJ': 'ASIN否精准',
+    'AK': 'ASIN否词组',
+}
+
+# 关键词列（找不到时生成逻辑会按固定列号兜底）
+KEYWORD_COLUMN_NAMES = [
+    'suzhu/宿主/host-精准词', 'suzhu/宿主/host-广泛词', 'suzhu/宿主/host-广泛词带加号',
+    'case/包-精准词', 'case/包-广泛词', 'case/包-广泛词带加号',
+]
+
+def build_header_index(df):
+    """一次扫描 survey 表头，建立 列名 -> 列索引 的查找表，并汇总缺失/重复列"""
+    names = {}                      # 去空格后的列名 -> 第一个匹配的列索引（也用于 活动名 -> ASIN 定向列）
+    by_base = defaultdict(list)     # 去掉重名后缀的列名 -> 全部列索引，用于发现重复列
+    keyword_columns = []
+    neg_asin_cols = []
+    neg_brand_cols = []
+    for col_idx, col in enumerate(df.columns):
+        name = str(col).strip()
+        names.setdefault(name, col_idx)
+        if not name.startswith('Unnamed:'):
+            by_base[DUP_SUFFIX_PATTERN.sub('', name)].append(col_idx)
+        if isinstance(col, str) and KEYWORD_COL_PATTERN.search(col):
+            keyword_columns.append(col)
+        if NEG_ASIN_COL_PATTERN.search(name):
+            neg_asin_cols.append(col_idx)
+        elif NEG_BRAND_COL_PATTERN.search(name):
+            neg_brand_cols.append(col_idx)
+
+    ambiguous = {base: idxs for base, idxs in by_base.items() if len(idxs) > 1}
+    # 否定ASIN / 否品牌 沿用原逻辑：多列匹配时取最后一列
+    if len(neg_asin_cols) > 1:
+        ambiguous['否定asin'] = neg_asin_cols
+    if len(neg_brand_cols) > 1:
+        ambiguous['否品牌'] = neg_brand_cols
+
+    expected = list(NEG_KEYWORD_COLUMNS.values()) + KEYWORD_COLUMN_NAMES
+    missing = [name for name in expected if name not in names]
+    if not neg_asin_cols:
+        missing.append('否定asin')
+    if not neg_brand_cols:
+        missing.append('否品牌')
+
+    return {
+        'names': names,
+        'keyword_columns': keyword_columns,
+        'neg_cols': {key: names.get(name) for key, name in NEG_KEYWORD_COLUMNS.items()},
+        'neg_asin_col': neg_asin_cols[-1] if neg_asin_cols else None,
+        'neg_brand_col': neg_brand_cols[-1] if neg_brand_cols else None,
+        'missing': missing,
+        'ambiguous': ambiguous,
+    }
+
+# ======== 活动名批量分类 ========
+EXACT_NAME_PATTERN = re.compile(r'精准|exact')
+BROAD_NAME_PATTERN = re.compile(r'广泛|broad')
+ASIN_NAME_PATTERN = re.compile(r'asin')
+
+def compile_campaign_classifier(categories):
+    """把有序的关键词类别编译成一个锚定正则：从左到右逐个尝试，越靠前的类别优先级越高"""
+    alternatives = '|'.join(f'.*?({re.escape(cat)})' for cat in categories)
+    return re.compile(f'^(?:{alternatives})', re.DOTALL)
+
+def classify_campaigns(campaign_names, classifier):
+    """批量识别一个区域的活动名，返回 category / match_type / is_exact / is_broad / is_asin 列（行顺序与输入一致）"""
+    names = pd.Series(campaign_names, dtype=object).astype(str).str.lower()
+    matched = names.str.extract(classifier)
+    # 每行只会命中一个捕获组，取第一个非空组即为类别
+    category = matched.bfill(axis=1).iloc[:, 0] if len(names) else pd.Series(dtype=object)
+    is_exact = names.str.contains(EXACT_NAME_PATTERN)
+    is_broad = names.str.contains(BROAD_NAME_PATTERN)
+    return pd.DataFrame({
+        'campaign_name': pd.Series(campaign_names, dtype=object),
+        'category': category.astype(object).where(category.notna(), None),
+        'match_type': (is_broad & ~is_exact).map({True: '广泛', False: '精准'}),  # 默认 精准
+        'is_exact': is_exact,
+        'is_broad': is_broad,
+        'is_asin': names.str.contains(ASIN_NAME_PATTERN),
+    })
+
+# ======== 区域活动提取 ========
+# 区域表头 -> 活动字段（列名转小写后需包含全部关键字；每列只归第一条命中的规则）
+SP_COLUMN_RULES = [
+    ('campaign_name', ['广告活动名称']),
+    ('cpc', ['cpc']),
+    ('sku', ['sku']),
+    ('budget', ['预算']),
+    ('group_bid', ['广告组默认竞价']),
+    ('ad_position', ['广告位']),
+    ('percentage', ['百分比']),
+]
+BRAND_COLUMN_RULES = [
+    ('campaign_name', ['广告活动名称']),
+    ('cpc', ['cpc']),
+    ('budget', ['预算']),
+    ('video_asset', ['视频媒体', '编号']),
+    ('custom_image', ['自定义图片']),
+    ('landing_type', ['落地页类型']),
+]
+SP_SKU_COL = 3  # 原逻辑：有 SKU 列时固定取 D 列
+BRAND_ASIN_COLS = [3, 4, 5]  # D、E、F 列：创意素材 ASIN
+BRAND_LOGO_FALLBACK_COL = 9  # J 列：品牌徽标素材编号
+
+def locate_region_columns(columns, rules):
+    """按规则定位区域列；同一字段命中多列时取最后一列（与原逐行扫描结果一致）"""
+    found = {}
+    for col_idx, col_name in enumerate(columns):
+        col_str = str(col_name).strip().lower()
+        for field, keys in rules:
+            if all(k in col_str for k in keys):
+                found[field] = col_idx
+                break
+    return found
+
+def join_unique_asins(cells):
+    """D→E→F 单元格按逗号拆分后有序去重，拼成 'A, B, C'"""
+    asins_list = []
+    for cell_val in cells:
+        cell_val = str(cell_val).strip()
+        if cell_val:
+            asins_list.extend([asin.strip() for asin in cell_val.split(',')])
+    return ', '.join(dict.fromkeys(asins_list))
+
+def locate_activity_columns(columns, target_theme, ui=st):
+    """按区域表头定位活动字段所在列，返回 字段 -> 列索引（只依赖表头，可随模版布局缓存）"""
+    if 'SP-商品推广' in target_theme:
+        cols = locate_region_columns(columns, SP_COLUMN_RULES)
+        if 'sku' in cols:
+            cols['sku'] = SP_SKU_COL
+        return cols
+
+    cols = locate_region_columns(columns, BRAND_COLUMN_RULES)
+    if len(columns) > BRAND_ASIN_COLS[0]:
+        cols['asins'] = BRAND_ASIN_COLS[0]
+
+    # 品牌徽标素材编号：优先按列名查找（最稳健），找不到再退回固定 J 列
+    logo_col = next((i for i, c in enumerate(columns) if '品牌徽标素材编号' in str(c)), None)
+    if logo_col is None:
+        if len(columns) > BRAND_LOGO_FALLBACK_COL:
+            logo_col = BRAND_LOGO_FALLBACK_COL
+            ui.write(f"  未找到‘品牌徽标素材编号’列名，使用固定J列（第10列） ({target_theme})")
+        else:
+            ui.warning(f"  数据列不足10列，无法读取品牌徽标素材编号 ({target_theme})")
+    cols['logo_asset'] = logo_col
+    return cols
+
+def extract_region_activities(activity_df, target_theme, cols):
+    """按已定位的列整列取出活动字段。
+    activity_df 是 df_survey 的切片（索引即 Excel 行号，列位置即表中列位置）；
+    返回活动表，每行一个活动并带 excel_row"""
+    def column(col_idx):
+        if col_idx is None:
+            return pd.Series('', index=activity_df.index, dtype=object)
+        return activity_df.iloc[:, col_idx].astype(str).str.strip()
+
+    if 'SP-商品推广' in target_theme:
+        activities = pd.DataFrame({field: column(cols.get(field)) for field, _ in SP_COLUMN_RULES})
+    else:
+        activities = pd.DataFrame({field: column(cols.get(field)) for field, _ in BRAND_COLUMN_RULES})
+        if cols.get('budget') is None:
+            activities['budget'] = '12'
+        asin_cols = [c for c in BRAND_ASIN_COLS if c < len(activity_df.columns)]
+        activities['asins'] = [join_unique_asins(cells) for cells in activity_df.iloc[:, asin_cols].itertuples(index=False)]
+        activities['logo_asset'] = column(cols.get('logo_asset'))
+
+    activities.insert(0, 'excel_row', activity_df.index)
+    return activities[activities['campaign_name'] != ''].reset_index(drop=True)
+
+# ======== 否定关键词列选择 ========
+HOST_CATEGORIES = ['suzhu', '宿主', 'host']
+CASE_CATEGORIES = ['case', '包']
+NEG_EXACT_KEYS = ['W', 'AA', 'Y', 'AC', 'AJ']  # 否定精准匹配列，其余为否定词组
+ASIN_NEG_KEYS = ['AJ', 'AK']  # SP-ASIN 活动的否定关键词列
+
+def select_negative_columns(matched_category, is_exact, is_broad):
+    """按关键词类别和匹配类型选出否定关键词列（列字母）"""
+    if matched_category in HOST_CATEGORIES:
+        return ['W', 'X'] if is_exact else ['AA', 'AB'] if is_broad else []
+    if matched_category in CASE_CATEGORIES:
+        return ['Y', 'Z'] if is_exact else ['AC', 'AD'] if is_broad else []
+    return []
+
+def column_keywords(df, col_idx):
+    """整列取非空值（去空格、保序去重），返回 {值: 首次出现的 Excel 行号}"""
+    cells = {}
+    for excel_row, v in df.iloc[:, col_idx].dropna().items():
+        kw = str(v).strip()
+        if kw:
+            cells.setdefault(kw, excel_row)
+    return cells
+
+class ColumnCells(dict):
+    """列索引 -> column_keywords 的结果；每列第一次用到时才清洗，之后直接复用（随模版快照一起保存）。
+    取出的字典是共享的，调用方只读不改"""
+    def __init__(self, df):
+        super().__init__()
+        self.df = df
+
+    def __missing__(self, col_idx):
+        cells = self[col_idx] = column_keywords(self.df, col_idx)
+        return cells
+
+def excel_cell(col_idx, excel_row):
+    """0-based 列索引 + Excel 行号 -> 单元格地址，例如 (11, 5) -> 'L5'"""
+    return f"{get_column_letter(col_idx + 1)}{excel_row}"
+
+def cell_span(col_idx, excel_rows):
+    """一列中若干行的单元格范围，用于日志，例如 'L2:L10'"""
+    excel_rows = list(excel_rows)
+    if not excel_rows:
+        return ''
+    first, last = excel_cell(col_idx, min(excel_rows)), excel_cell(col_idx, max(excel_rows))
+    return first if first == last else f"{first}:{last}"
+
+def find_negative_conflicts(column_cells, col_indices, col_keys):
+    """同一否定匹配类型下出现在多个来源列的关键词，返回 {(m_type, kw): [单元格地址, ...]}"""
+    sources = defaultdict(list)
+    for col_key in col_keys:
+        if col_indices.get(col_key) is not None:
+            col_idx = col_indices[col_key]
+            m_type = '否定精准匹配' if col_key in NEG_EXACT_KEYS else '否定词组'
+            for kw, excel_row in column_cells[col_idx].items():
+                sources[(m_type, kw)].append(excel_cell(col_idx, excel_row))
+    return {key: cells for key, cells in sources.items() if len(cells) > 1}
+
+def negative_keywords(column_cells, col_indices, col_keys):
+    """选中的否定列按匹配类型合并去重：{'否定精准匹配': [kw, ...], '否定词组': [kw, ...]}，按列顺序保留首次出现。
+    同一匹配类型下跨列重复的词在统一校验阶段 (validate_template) 已拦截"""
+    negatives = {'否定精准匹配': {}, '否定词组': {}}
+    for col_key in col_keys:
+        if col_indices.get(col_key) is not None:
+            m_type = '否定精准匹配' if col_key in NEG_EXACT_KEYS else '否定词组'
+            negatives[m_type].update(dict.fromkeys(column_cells[col_indices[col_key]]))
+    return {m_type: list(kws) for m_type, kws in negatives.items()}
+
+# ======== 跨活动关键词重叠 ========
+# 重叠明细只显示在页面上（表格右上角可下载 CSV），不写进上传用的 Header 文件
+KEYWORD_OVERLAP_COLUMNS = ['广告类型', '关键词', '匹配类型', '广告活动编号', '区域', '重叠活动数']
+
+def keyword_key(kw):
+    """关键词比较用的键：忽略大小写和多余空格（亚马逊按同一个词处理）"""
+    return ' '.join(kw.casefold().split())
+
+def keyword_overlap_rows(keyword_index):
+    """keyword_index: {(广告类型, 关键词键, 匹配类型): {活动名: 区域}}，生成关键词行时顺带记下，代价与关键词总数成正比。
+    逐行给出被两个及以上活动投放的组合，每个活动一行，重叠活动多的排在前面"""
+    overlaps = sorted(((key, campaigns) for key, campaigns in keyword_index.items() if len(campaigns) > 1),
+                      key=lambda item: -len(item[1]))
+    for (product, kw, match_type), campaigns in overlaps:
+        for campaign, theme in campaigns.items():
+            yield [product, kw, match_type, campaign, theme, len(campaigns)]
+
+# ======== 预估：不拼任何行，按列长度算出每个活动、每个 Sheet 会生成的行数 ========
+ESTIMATE_COLUMNS = {'theme': '区域', 'excel_row': 'Excel 行号', 'campaign': '广告活动', 'sheet': '工作表',
+                    'base': '活动/广告组/广告', 'keywords': '关键词', 'negatives': '否定关键词',
+                    'targets': '商品定向', 'neg_targets': '否定商品定向', 'bid_adjust': '竞价调整', 'total': '合计'}
+ESTIMATE_COUNT_KEYS = ['base', 'keywords', 'negatives', 'targets', 'neg_targets', 'bid_adjust']
+
+def estimate_header_rows(regions, schema, column_cells, header_index, neg_asin_count, neg_brand_count):
+    """按生成规则数出每个活动会生成多少行（与实际生成的一致）：关键词/否定词/ASIN 定向的行数就是所用列（已清洗去重）的长度。
+    关键词重叠组数按列合并投放该列的活动算出，代价与用到的列里的关键词数成正比，与活动数无关。
+    返回 (每个活动一条的 [dict], {Sheet 名: 行数}, 重叠的关键词组数)"""
+    col_indices = header_index['neg_cols']
+    negative_counts = {}  # 否定列组合 -> 去重后的词数；同一组合的活动共用
+
+    def negatives(col_keys):
+        key = tuple(col_keys)
+        if key not in negative_counts:
+            negative_counts[key] = sum(len(kws) for kws in negative_keywords(column_cells, col_indices, col_keys).values())
+        return negative_counts[key]
+
+    campaigns = []
+    keyword_campaigns = defaultdict(lambda: defaultdict(set))  # (广告类型, 匹配类型) -> 关键词列 -> {活动名}
+    for region in regions:
+        theme = region['theme']
+        is_sp = 'SP-商品推广' in theme
+        product_key, product = ('sp', '商品推广') if is_sp else ('brand', '品牌推广')
+        for activity, cls in zip(region['activities'].to_dict('records'), region['classes'].to_dict('records')):
+            counts = dict.fromkeys(ESTIMATE_COUNT_KEYS, 0)
+            counts['base'] = 3  # 广告活动、广告组、商品广告/广告实体
+            if cls['is_asin']:
+                col_idx = header_index['names'].get(str(activity['campaign_name']))
+                counts['targets'] = len(column_cells[col_idx]) if col_idx is not None else 0
+                # SP 的否品牌生成已禁用
+                counts['neg_targets'] = neg_asin_count if is_sp else neg_asin_count + neg_brand_count
+                if is_sp:
+                    counts['negatives'] = negatives(ASIN_NEG_KEYS)
+            else:
+                col_idx = keyword_column(schema, product_key, cls)[1]
+                if col_idx is not None:
+                    counts['keywords'] = len(column_cells[col_idx])
+                    keyword_campaigns[(product, cls['match_type'])][col_idx].add(activity['campaign_name'])
+                if cls['category']:
+                    counts['negatives'] = negatives(select_negative_columns(cls['category'], cls['is_exact'], cls['is_broad']))
+            if is_sp and activity.get('ad_position', '').strip() and activity.get('percentage', '').strip():
+                counts['bid_adjust'] = 1
+            campaigns.append({'theme': theme, 'excel_row': activity['excel_row'], 'campaign': activity['campaign_name'],
+                              'sheet': 'SP-商品推广' if is_sp else '品牌广告', **counts, 'total': sum(counts.values())})
+
+    overlap_groups = 0
+    for columns in keyword_campaigns.values():
+        targeted = defaultdict(set)  # 关键词键 -> {活动名}
+        for col_idx, names in columns.items():
+            for kw in column_cells[col_idx]:
+                targeted[keyword_key(kw)] |= names
+        for names in targeted.values():
+            if len(names) > 1:
+                overlap_groups += 1
+
+    sheet_rows = {sheet: sum(c['total'] for c in campaigns if c['sheet'] == sheet) for sheet in ('品牌广告', 'SP-商品推广')}
+    return campaigns, sheet_rows, overlap_groups
+
+# ======== 统一校验 ========
+STRICT_THEMES = ['SB落地页：商品集', 'SBV落地页：品牌旗舰店']  # 必须依赖全局设置的主题
+REQUIRED_GLOBALS = ['creative_title', 'landing_url']
+
+# 必填校验：(适用主题关键字, 活动字段, 错误说明)；主题关键字为 None 表示所有区域
+REQUIRED_FIELD_RULES = [
+    (None, 'cpc', "缺少 'CPC'"),
+    (None, 'budget', "缺少 '预算'"),
+    (['SP-商品推广'], 'sku', "缺少 'SKU'"),
+    (['SP-商品推广'], 'group_bid', "缺少 '广告组默认竞价'"),
+    (['品牌旗舰店', '商品详情页'], 'video_asset', "缺少 '视频媒体编号'"),
+    (['品牌旗舰店', '商品集'], 'logo_asset', "缺少 '品牌徽标素材编号'"),  # 商品详情页不需要 Logo
+    (['品牌旗舰店', '商品集', '商品详情页'], 'landing_type', "缺少 '落地页类型'"),
+    (['品牌旗舰店', '商品集', '商品详情页'], 'asins', "缺少 '创意素材 ASIN' (请检查 D、E、F 列是否填写)"),
+]
+# 数值校验：生成时要转成数字的活动字段 -> 显示名称
+NUMERIC_FIELD_RULES = {'cpc': 'CPC', 'budget': '预算', 'group_bid': '广告组默认竞价'}
+
+VALIDATION_ERROR_COLUMNS = {'excel_row': 'Excel 行号', 'cell': '单元格', 'theme': '区域', 'campaign': '广告活动', 'message': '问题'}
+
+def validate_template(regions, global_settings, column_cells, header_index):
+    """统一校验阶段：生成任何行之前，按区域整列检查全部规则，返回全部错误（每条带真实 Excel 行号）"""
+    errors = []
+
+    def add(theme, activities, mask, col_idx, message):
+        """记录 mask 命中的活动；col_idx 为出错字段所在列（None 表示该列不存在，只给出行号）"""
+        for excel_row, campaign_name in activities.loc[mask, ['excel_row', 'campaign_name']].itertuples(index=False):
+            errors.append({'excel_row': excel_row, 'cell': excel_cell(col_idx, excel_row) if col_idx is not None else '',
+                           'theme': theme, 'campaign': campaign_name, 'message': message})
+
+    missing_globals = [k for k in REQUIRED_GLOBALS if not global_settings.get(k)]
+    col_indices = header_index['neg_cols']
+    neg_groups = defaultdict(list)  # 否定列组合 -> [(theme, excel_row, campaign_name)]
+
+    for region in regions:
+        theme, activities, classes = region['theme'], region['activities'], region['classes']
+        field_cols = region['field_cols']
+        if activities.empty:
+            continue
+        every_row = pd.Series(True, index=activities.index)
+        name_col = field_cols.get('campaign_name')
+
+        # 1. 全局设置：该区域只要有活动，就必须填写
+        if theme in STRICT_THEMES and missing_globals:
+            add(theme, activities, every_row, name_col, f"该区域存在广告活动，必须填写全局设置：{missing_globals}")
+
+        # 2. 必填项
+        for themes, field, message in REQUIRED_FIELD_RULES:
+            if themes is not None and not any(t in theme for t in themes):
+                continue
+            if field in activities:
+                add(theme, activities, activities[field].str.strip() == '', field_cols.get(field), message)
+
+        # 3. 数字格式
+        for field, label in NUMERIC_FIELD_RULES.items():
+            if field not in activities:
+                continue
+            values = activities[field].str.strip()
+            bad = (values != '') & pd.to_numeric(values, errors='coerce').isna()
+            for excel_row, raw in activities.loc[bad, ['excel_row', field]].itertuples(index=False):
+                add(theme, activities, activities['excel_row'] == excel_row, field_cols.get(field),
+                    f"'{label}' 不是有效数字，当前填写内容为: '{raw}'")
+        if 'percentage' in activities:
+            values = activities['percentage'].str.strip()
+            bad = (values != '') & pd.to_numeric(values.str.replace('%', '', regex=False), errors='coerce').isna()
+            for excel_row, raw in activities.loc[bad, ['excel_row', 'percentage']].itertuples(index=False):
+                add(theme, activities, activities['excel_row'] == excel_row, field_cols.get('percentage'),
+                    f"'百分比' 列数据错误！当前填写内容为: '{raw}'。请改为纯数字 (例如: 50)。")
+
+        # 4. ASIN 投放：表头必须有与活动同名的列，且列下有数据
+        for excel_row, campaign_name in activities.loc[classes['is_asin'], ['excel_row', 'campaign_name']].itertuples(index=False):
+            col_idx = header_index['names'].get(campaign_name)
+            if col_idx is None or not column_cells[col_idx]:
+                add(theme, activities, activities['excel_row'] == excel_row, name_col,
+                    "是 ASIN 投放，但在表头未找到对应列或列下无数据！")
+
+        # 5. 记录每个活动要用的否定列组合，下面按组合只检查一次
+        is_sp = 'SP-商品推广' in theme
+        for excel_row, campaign_name, cls in zip(activities['excel_row'], activities['campaign_name'], classes.to_dict('records')):
+            if cls['is_asin']:
+                col_keys = ASIN_NEG_KEYS if is_sp else []
+            elif cls['category']:
+                col_keys = select_negative_columns(cls['category'], cls['is_exact'], cls['is_broad'])
+            else:
+                col_keys = []
+            if col_keys:
+                neg_groups[tuple(col_keys)].append((theme, excel_row, campaign_name))
+
+    # 6. 重复否定关键词：同一关键词在同一否定类型的多个来源列出现，会生成重复行
+    for col_keys, campaigns in neg_groups.items():
+        for (m_type, kw), cells in find_negative_conflicts(column_cells, col_indices, col_keys).items():
+            for theme, excel_row, campaign_name in campaigns:
+                errors.append({'excel_row': excel_row, 'cell': ', '.join(cells), 'theme': theme, 'campaign': campaign_name,
+                               'message': f"重复否定关键词 '{kw}' ({m_type}) 同时出现在多个否定列，会生成重复行，请清理重复值"})
+
+    return sorted(errors, key=lambda err: err['excel_row'])
+
+# Output columns for Brand (SB/SBV) - original 27 columns
+OUTPUT_COLUMNS_BRAND = [
+    '产品', '实体层级', '操作', '广告活动编号', '广告组编号', '广告编号', 
+    '广告活动名称', '广告组名称', '广告名称', '状态', '品牌实体编号', 
+    '预算类型', '预算', '商品位置', '竞价', '关键词文本', '匹配类型', '拓展商品投放编号', 
+    '落地页 URL', '落地页类型', '品牌名称', '同意翻译', '品牌徽标素材编号', 
+    '创意素材标题', '创意素材 ASIN', '视频素材编号', '自定义图片', '落地页 ASIN'
+]
+
+# Output columns for SP - based on header-B_US (25 columns)
+OUTPUT_COLUMNS_SP = [
+    '产品', '实体层级', '操作', '广告活动编号', '广告组编号', '广告组合编号', '广告编号', '关键词编号', 
+    '商品投放 ID', '广告活动名称', '广告组名称', '开始日期', '结束日期', '投放类型', '状态', 
+    '每日预算', 'SKU', '广告组默认竞价', '竞价', '关键词文本', '匹配类型', '竞价方案', 
+    '广告位', '百分比', '拓展商品投放编号'
+]
+
+# ======== 行模版：每个活动固定的列只拼一次，关键词/否定词/定向等展开行只填变化的那一列 ========
+SP_ROW_WIDTH = len(OUTPUT_COLUMNS_SP)
+BRAND_ROW_WIDTH = len(OUTPUT_COLUMNS_BRAND)
+
+def row_template(width, *fixed):
+    """一个活动的行模版：fixed 为若干 {列位置: 值}，其余列为空串；返回 tuple，活动内所有展开行共用"""
+    row = [''] * width
+    for cols in fixed:
+        for col, value in cols.items():
+            row[col] = value
+    return tuple(row)
+
+def fill_rows(template, col, values):
+    """按模版每个值展开一行，只替换第 col 列；每行是模版的一份浅拷贝，与逐行手写的结果相同"""
+    row = list(template)
+    rows = []
+    for value in values:
+        row[col] = value
+        rows.append(row.copy())
+    return rows
+
+# ======== 模版布局：区域定位 + 按模版指纹缓存的布局 schema ========
+# 支持的主题（添加SP），也是生成顺序；找全局设置范围时按此顺序取第一个找到的主题
+THEMES = ["SBV落地页：品牌旗舰店", "SB落地页：商品集", "SBV落地页：商品详情页", "SP-商品推广"]
+GLOBAL_SETTING_ROWS = 20  # 全局设置只在前 20 行
+
+# A 列标签 -> 全局设置键（按顺序匹配，第一条命中的规则生效）
+GLOBAL_SETTING_RULES = [
+    ('entity_id', lambda label: '品牌实体编号' in label or 'ENTITY' in label.upper()),
+    ('brand_name', lambda label: '品牌名称' in label),
+    ('budget_type', lambda label: '预算类型' in label),
+    ('creative_title', lambda label: '创意素材标题' in label),
+    ('landing_url', lambda label: '落地页 URL' in label),
+]
+
+# (广告类型, 匹配类型, 类别组) -> (关键词列名, 找不到列名时的固定列号)
+KEYWORD_COLUMN_RULES = {
+    ('sp', '精准', 'host'): ('suzhu/宿主/host-精准词', 11),       # L
+    ('sp', '精准', 'case'): ('case/包-精准词', 14),               # O
+    ('sp', '广泛', 'host'): ('suzhu/宿主/host-广泛词', 12),       # M
+    ('sp', '广泛', 'case'): ('case/包-广泛词', 15),               # P
+    ('brand', '精准', 'host'): ('suzhu/宿主/host-精准词', 11),    # L
+    ('brand', '精准', 'case'): ('case/包-精准词', 14),            # O
+    ('brand', '广泛', 'host'): ('suzhu/宿主/host-广泛词带加号', 13),  # N：SB/SBV 广泛用带加号列
+    ('brand', '广泛', 'case'): ('case/包-广泛词带加号', 16),       # Q
+}
+LAYOUT_SCHEMA_LIMIT = 32  # 最多缓存的模版版本数
+
+def locate_regions(df):
+    """一次扫描 A 列定位所有主题区域，返回 主题 -> (header_row, end_row)（0-based 位置，Excel 行号见 df.index）。
+    header 在主题行下一行；区域到下一个其它主题行之前，没有则到文件末尾"""
+    col_a = df.iloc[:, 0].astype(str).str.strip()
+    hits = {theme: np.flatnonzero(col_a.str.contains(theme, regex=False).to_numpy()) for theme in THEMES}
+    regions = {}
+    for theme in THEMES:
+        if not len(hits[theme]):
+            continue
+        theme_row = hits[theme][0]
+        later = [rows[rows > theme_row] for other, rows in hits.items() if other != theme]
+        next_rows = [rows[0] for rows in later if len(rows)]
+        end_row = min(next_rows) - 1 if next_rows else len(df) - 1
+        regions[theme] = (int(theme_row) + 1, int(end_row))
+    return regions
+
+def discover_keyword_categories(keyword_columns):
+    """从关键词列名中提取类别，返回有序列表：列表顺序就是活动名匹配类别时的优先级（表头从左到右，再到默认类别）"""
+    keyword_categories = []
+    for col in keyword_columns:
+        col_lower = str(col).lower()
+        if '/' in col_lower:
+            parts = col_lower.split('/')
+            if len(parts) > 0 and parts[0]:
+                keyword_categories.append(parts[0].strip())
+            if len(parts) > 1 and parts[1]:
+                chinese_part = parts[1].split('-')[0].strip() if '-' in parts[1] else parts[1].strip()
+                keyword_categories.append(chinese_part)
+        else:
+            for suffix in ['精准词', '广泛词', '精准', '广泛']:
+                if col_lower.endswith(suffix):
+                    prefix = col_lower[:-len(suffix)].strip()
+                    if prefix:
+                        keyword_categories.append(prefix)
+                        break
+    keyword_categories.extend(['suzhu', '宿主', 'host', 'case', '包', '对手', 'tape'])
+    return list(dict.fromkeys(keyword_categories))  # 有序去重
+
+def category_group(matched_category):
+    """活动类别 -> 关键词列所属组（host / case），其它类别返回 None"""
+    if matched_category in HOST_CATEGORIES:
+        return 'host'
+    if matched_category in CASE_CATEGORIES:
+        return 'case'
+    return None
+
+def keyword_column(schema, product_key, campaign_class):
+    """活动要用的关键词列：按 (sp/brand, 匹配类型, 类别组) 从布局 schema 取，返回 (列名, 列索引, 是否按固定列号兜底)"""
+    return schema['keyword_columns'].get(
+        (product_key, campaign_class['match_type'], category_group(campaign_class['category'])), (None, None, False))
+
+def plan_keyword_columns(header_index, n_cols):
+    """为每种 (广告类型, 匹配类型, 类别组) 定好关键词列：
+    返回 -> (列名, 列索引或 None, 是否走了固定列号兜底)"""
+    plan = {}
+    for key, (col_name, fallback_idx) in KEYWORD_COLUMN_RULES.items():
+        col_idx = header_index['names'].get(col_name)
+        used_fallback = col_idx is None
+        if used_fallback:
+            col_idx = fallback_idx
+        plan[key] = (col_name, col_idx if col_idx < n_cols else None, used_fallback)
+    return plan
+
+def global_setting_label(df, pos):
+    return str(df.iloc[pos, 0]).strip()
+
+def locate_global_rows(df, global_limit):
+    """前 20 行（且在第一个主题前）里识别全局设置行，返回 [(设置键, 行位置)]（后出现的同名设置覆盖前面的）"""
+    rows = []
+    for pos in range(min(GLOBAL_SETTING_ROWS, global_limit, len(df))):
+        label = global_setting_label(df, pos)
+        key = next((key for key, match in GLOBAL_SETTING_RULES if match(label)), None)
+        if key:
+            rows.append((key, pos))
+    return rows
+
+def read_global_settings(df, global_rows):
+    """按布局记录的行位置读取 B 列的全局设置值"""
+    global_settings = {}
+    for key, pos in global_rows:
+        value = str(df.iloc[pos, 1]).strip() if len(df.columns) > 1 else ''
+        if key == 'budget_type' and not value:
+            value = '每日'
+        global_settings[key] = value
+    return global_settings
+
+def template_fingerprint(df, global_limit):
+    """模版指纹：表头列名 + 全局设置区 A 列标签。
+    同一版本的模版指纹相同，只是活动/关键词数量不同"""
+    labels = [global_setting_label(df, pos) for pos in range(min(GLOBAL_SETTING_ROWS, global_limit, len(df)))]
+    digest = hashlib.sha1()
+    digest.update('\x1f'.join(str(c) for c in df.columns).encode('utf-8'))
+    digest.update(b'\x1e')
+    digest.update('\x1f'.join(labels).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+@st.cache_resource(show_spinner=False)
+def layout_schema_cache():
+    """进程内共享的 模版指纹 -> 布局 schema（跨会话、跨重跑保留）"""
+    return {}
+
+def load_layout_schema(df, global_limit):
+    """按模版指纹取布局 schema；未知版本完整发现一次（表头索引、关键词类别、关键词列、全局设置行）后缓存。
+    返回 (schema, 是否命中缓存)"""
+    cache = layout_schema_cache()
+    fingerprint = template_fingerprint(df, global_limit)
+    schema = cache.get(fingerprint)
+    if schema is not None:
+        return schema, True
+
+    header_index = build_header_index(df)
+    keyword_categories = discover_keyword_categories(header_index['keyword_columns'])
+    schema = {
+        'fingerprint': fingerprint,
+        'header_index': header_index,
+        'keyword_categories': keyword_categories,
+        'campaign_classifier': compile_campaign_classifier(keyword_categories),
+        'keyword_columns': plan_keyword_columns(header_index, len(df.columns)),
+        'global_rows': locate_global_rows(df, global_limit),
+        'region_columns': {},  # (主题类型, 区域表头) -> 字段列，第一次遇到该区域时填入
+    }
+    if len(cache) >= LAYOUT_SCHEMA_LIMIT:
+        cache.pop(next(iter(cache)))
+    cache[fingerprint] = schema
+    return schema, False
+
+def region_field_columns(schema, columns, target_theme, ui=st):
+    """区域字段列按 (主题类型, 区域表头) 缓存在 schema 里；区域表头不变时直接复用"""
+    kind = 'sp' if 'SP-商品推广' in target_theme else 'brand'
+    key = (kind, tuple(str(c) for c in columns))
+    cols = schema['region_columns'].get(key)
+    if cols is None:
+        cols = locate_activity_columns(columns, target_theme, ui)
+        schema['region_columns'][key] = cols
+    return dict(cols)
+
+# ======== 后台生成任务：进度、取消、结果跨重跑保留 ========
+class LogRecorder:
+    """后台线程里代替 st 记录日志调用，生成结束后在页面上按原顺序重放"""
+    DISPLAY_CALLS = ('write', 'warning', 'error', 'info', 'success', 'dataframe')
+
+    def __init__(self):
+        self.entries = []
+        self._stack = [self.entries]  # 当前写入位置（with container/expander 时切换）
+
+    def __getattr__(self, name):
+        if name not in LogRecorder.DISPLAY_CALLS:
+            raise AttributeError(name)
+        return lambda *args, **kwargs: self._stack[-1].append((name, args, kwargs, None))
+
+    def container(self, *args, **kwargs):
+        return self._block('container', args, kwargs)
+
+    def expander(self, *args, **kwargs):
+        return self._block('expander', args, kwargs)
+
+    def _block(self, name, args, kwargs):
+        block = LogBlock(self)
+        self._stack[-1].append((name, args, kwargs, block.entries))
+        return block
+
+class LogBlock:
+    """LogRecorder 里的 container / expander：with 块内的调用记到这里"""
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.entries = []
+
+    def __enter__(self):
+        self.recorder._stack.append(self.entries)
+        return self
+
+    def __exit__(self, *exc):
+        self.recorder._stack.pop()
+        return False
+
+def replay_log(entries):
+    """把 LogRecorder 记下的调用按原结构输出到页面"""
+    for name, args, kwargs, children in entries:
+        if children is None:
+            getattr(st, name)(*args, **kwargs)
+        else:
+            with getattr(st, name)(*args, **kwargs):
+                replay_log(children)
+
+def submit_header_job(uploaded_bytes, upload_key, output_format, max_rows_per_file=0, max_bytes_per_file=0,
+                      block_keyword_overlap=False, dry_run=False, themes=None):
+    """提交到共享任务池；任务信息里带上传文件哈希和日志记录器"""
+    log = LogRecorder()
+    return shared_job_pool().submit(
+        session_user(), "广告 Header 预估" if dry_run else "广告 Header 生成",
+        lambda job: generate_header_for_sbv_brand_store(uploaded_bytes, ui=log, job=job, output_format=output_format,
+                                                        max_rows_per_file=max_rows_per_file,
+                                                        max_bytes_per_file=max_bytes_per_file,
+                                                        block_keyword_overlap=block_keyword_overlap, dry_run=dry_run,
+                                                        themes=themes),
+        info={'upload_key': upload_key, 'log': log})
+
+@st.fragment(run_every=1)
+def header_job_panel(job):
+    """排队/生成中：每秒刷新排队位置或进度（只重跑这个片段）；完成后整页重跑取结果"""
+    if job.done():
+        st.rerun()
+    position = job.position()
+    if position:
+        st.progress(0.0, text=f"⏳ 服务器繁忙，排队中：第 {position} 位")
+    else:
+        st.progress(job.progress, text=job.text)
+    if st.button("取消生成"):
+        job.cancel()
+        st.rerun()
+
+def show_header_job_result(job):
+    """展示已完成任务的日志和下载按钮（结果存在 job 上，重跑不会重新生成）"""
+    if job.cancelled:
+        st.warning("已取消生成。")
+        return
+    error = job.exception()
+    if error is not None:
+        st.error(f"生成时出错：{error}")
+        return
+    replay_log(job.info['log'].entries)
+    output = job.result()
+    if output is not None:
+        output_buffer, suffix = output
+        # Generate filename with submit time (precise to minute)
+        timestamp = job.submitted_at.strftime("%Y-%m-%d %H:%M")
+        filename = f"header-{timestamp}.{suffix}"
+
+        st.download_button(
+            label="下载生成的 Header 文件",
+            data=output_buffer.getvalue(),
+            file_name=filename,
+            mime=OUTPUT_MIME[suffix]
+        )
+
+def read_template(uploaded_bytes, sheet_name):
+    """xlsx 流式读取 sheet（结果与 pd.read_excel(header=0) 一致）；其它格式（.xls）仍交给 pd.read_excel"""
+    if zipfile.is_zipfile(io.BytesIO(uploaded_bytes)):
+        return read_sheet_frame(uploaded_bytes, sheet_name)
+    return pd.read_excel(io.BytesIO(uploaded_bytes), sheet_name=sheet_name, header=0)
+
+# ======== 模版快照：同一份文件（内容哈希相同）再次生成时跳过解析 ========
+SNAPSHOT_VERSION = 2  # 读取/清洗规则变化时加一，旧快照自动失效
+
+def load_template_snapshot(uploaded_bytes, sheet_name):
+    """按内容哈希取解析好的模版：清洗后的整表、主题区域位置和已清洗的关键词列。
+    整表和区域只在第一次读取时存一次；已清洗的关键词列单独存一个快照，列变多时只重写这一个。
+    没有快照时读取文件并存盘；读取失败的异常原样抛出。返回 (快照, 是否命中)"""
+    key = f"header-{hashlib.sha1(uploaded_bytes).hexdigest()}-{hashlib.sha1(sheet_name.encode('utf-8')).hexdigest()[:8]}-v{SNAPSHOT_VERSION}"
+    parsed = snapshot_cache.load(key)
+    if parsed is not None:
+        column_cells = ColumnCells(parsed['frame'])
+        column_cells.update(snapshot_cache.load(key + '-columns') or {})
+        return {'key': key, 'frame': parsed['frame'], 'regions': parsed['regions'],
+                'column_cells': column_cells, 'saved_columns': len(column_cells)}, True
+
+    # Read the entire file, header=0（直接从上传的字节流式读取，不再落临时文件）
+    df_survey = read_template(uploaded_bytes, sheet_name)
+
+    #Fill NaN with empty string
+    df_survey = df_survey.fillna('')
+
+    # 行号索引：第 1 行是表头，所以把索引直接设成 Excel 行号（数据从第 2 行开始；读取时中间的空行已按原行号补齐）。
+    # 之后切出的区域、整列取出的关键词都带着各自在表中的行号，报错和日志可以直接定位到单元格
+    df_survey.index = pd.RangeIndex(2, len(df_survey) + 2)
+
+    parsed = {
+        'frame': df_survey,
+        'regions': locate_regions(df_survey),  # 一次扫描 A 列定位所有主题区域
+    }
+    snapshot_cache.save(key, parsed)
+    return {**parsed, 'key': key, 'column_cells': ColumnCells(df_survey), 'saved_columns': 0}, False
+
+def update_template_snapshot(snapshot):
+    """本次运行新清洗过的列写回快照（只写关键词列，不重写整表），下次同一文件直接复用"""
+    if len(snapshot['column_cells']) > snapshot['saved_columns']:
+        snapshot['saved_columns'] = len(snapshot['column_cells'])
+        snapshot_cache.save(snapshot['key'] + '-columns', dict(snapshot['column_cells']))
+
+# Function from the original script (copied and adapted)
+# ui: 日志输出目标（页面上直接用 st，后台任务传 LogRecorder）；job: 后台任务，用于汇报进度和响应取消
+# output_format: OUTPUT_FORMATS 的键；max_rows_per_file/max_bytes_per_file: 拆分预算（0 不拆），拆成多个文件时打包成 zip
+# block_keyword_overlap: 同一关键词+匹配类型被多个活动投放时停止生成（否则只在页面上列出重叠明细，照常输出）
+# dry_run: 只校验并预估每个活动/Sheet 的行数（不生成行、不写文件），结果显示在页面上，返回 None
+# themes: 只处理这些区域（THEMES 的子集，None 为全部）；没选的区域不切片、不提取活动、不校验也不生成
+# 成功时返回 (输出字节流, 文件后缀)，失败返回 None
+def generate_header_for_sbv_brand_store(uploaded_bytes, sheet_name='广告模版', ui=st, job=None, output_format='xlsx',
+                                        max_rows_per_file=0, max_bytes_per_file=0, block_keyword_overlap=False,
+                                        dry_run=False, themes=None):
+    def checkpoint(progress, text):
+        """汇报进度；任务已被取消时抛出 JobCancelled 中止"""
+        if job is not None:
+            job.update(progress, text)
+    
+    try:
+        snapshot, snapshot_hit = load_template_snapshot(uploaded_bytes, sheet_name)
+        df_survey = snapshot['frame']
+        ui.write(f"成功读取文件，数据形状：{df_survey.shape}" + ("（同一文件已解析过，使用缓存的快照）" if snapshot_hit else ""))
+        ui.write(f"列名列表: {list(df_survey.columns)}")
+    except SheetNotFound:
+        ui.error(f"错误：未找到文件。请确保文件包含 '{sheet_name}' sheet。")
+        return None
+    except Exception as e:
+        ui.error(f"读取文件时出错：{e}")
+        return None
+    column_cells = snapshot['column_cells']
+
+    # ======== 【修改 1：建立外部显示区】 ========
+    # 在 expander 外面建立一个容器，专门用来显示错误，这样不用点开折叠框也能看到
+    error_area = ui.container()
+    # =========================================
+
+    # 大 expander 包裹所有详细日志；row_buffers 在离开时关闭所有输出行缓冲（含提前返回、取消和异常），删掉磁盘临时库
+    with ui.expander("查看详细日志", expanded=False), ExitStack() as row_buffers:
+
+        # 主题区域在读取时已一次扫描 A 列定位好
+        region_bounds = snapshot['regions']
+        selected_themes = [t for t in THEMES if themes is None or t in themes]
+        if len(selected_themes) < len(THEMES):
+            ui.write(f"只处理所选区域: {selected_themes}，跳过: {[t for t in THEMES if t not in selected_themes]}")
+        for theme in selected_themes:
+            if theme in region_bounds:
+                header_row, end_row = region_bounds[theme]
+                ui.write(f"找到 '{theme}' 区域: 主题行 A{df_survey.index[header_row - 1]}, header行 {df_survey.index[header_row]}, 数据到行 {df_survey.index[end_row]}")
+            else:
+                ui.warning(f"错误：未找到主题 '{theme}' 在A列")
+        if not region_bounds:
+            ui.error("未找到任何支持的主题区域")
+            return None
+        if not any(t in region_bounds for t in selected_themes):
+            ui.error(f"所选区域 {selected_themes} 在模版中都没有找到")
+            return None
+        # 全局设置范围限在第一个主题前（按 THEMES 顺序取第一个找到的主题）
+        global_limit = next(region_bounds[t][0] for t in THEMES if t in region_bounds)
+
+        # 模版指纹 -> 布局 schema：已知版本直接复用，未知版本完整发现一次并记住
+        schema, schema_hit = load_layout_schema(df_survey, global_limit)
+        header_index = schema['header_index']
+        if schema_hit:
+            ui.write(f"模版指纹 {schema['fingerprint']}: 已知版本，复用缓存的布局（跳过表头/关键词列/全局设置行发现）")
+        else:
+            ui.write(f"模版指纹 {schema['fingerprint']}: 新版本，已完成布局发现并缓存")
+
+        # 表头检查结果集中在这里报告
+        ui.write(f"表头索引: 共 {len(header_index['names'])} 个列名")
+        if header_index['missing']:
+            ui.warning(f"表头缺少以下列（关键词列将按固定列号兜底，其余跳过）: {header_index['missing']}")
+        for name, idxs in header_index['ambiguous'].items():
+            ui.warning(f"表头列 '{name}' 出现多次 (列索引 {idxs})，按原规则只取其中一列")
+
+        # Extract global settings: 只读布局里记录的全局设置行（A 列标签、B 列值）
+        global_settings = read_global_settings(df_survey, schema['global_rows'])
+        ui.write(f"全局设置: {global_settings}")
+        
+        # 全局设置是否缺失（SB/SBV 旗舰店、商品集必须填写）并入下方统一校验阶段
+        
+        # Keyword columns: 直接取表头索引中的关键词相关列
+        keyword_columns = header_index['keyword_columns']
+        ui.write(f"关键词相关列: {keyword_columns}")
+        
+        # 关键词类别及活动名分类器随布局 schema 缓存
+        keyword_categories = schema['keyword_categories']
+        campaign_classifier = schema['campaign_classifier']
+        ui.write(f"识别到的关键词类别（按优先级）: {keyword_categories}")
+        
+        # Negative keywords extraction: 列字母 -> 列索引，由表头索引解析
+        col_indices = header_index['neg_cols']
+        
+        # Extract neg_asin and neg_brand from specific columns
+        neg_asin = []
+        neg_brand = []
+        neg_asin_col = header_index['neg_asin_col']
+        neg_brand_col = header_index['neg_brand_col']
+        if neg_asin_col is not None:
+            neg_asin = list(column_cells[neg_asin_col])
+        # 否品牌只用于品牌广告（SP 的否品牌生成已禁用），只选了 SP 时不读取
+        if neg_brand_col is not None and any('SP-商品推广' not in t for t in selected_themes):
+            neg_brand = [str(int(x)).strip() for x in df_survey.iloc[:, neg_brand_col].dropna() if str(x).strip()]
+            neg_brand = list(dict.fromkeys(neg_brand))
+        ui.write(f"否定ASIN: {neg_asin}")
+        ui.write(f"否品牌: {neg_brand}")
+        # 否定商品定向的投放表达式与活动无关，所有 ASIN 活动共用
+        neg_asin_targets = [f'asin="{neg}"' for neg in neg_asin]
+        neg_brand_targets = [f'brand="{negb}"' for negb in neg_brand]
+        
+        product_brand = '品牌推广'
+        product_sp = '商品推广'
+        operation = 'Create'
+        status = '已启用'
+        
+        # Separate rows for brand and SP：行数多时超过 HEADER_SPILL_MB 转存到磁盘临时库
+        brand_rows = row_buffers.enter_context(RowBuffer(BRAND_ROW_WIDTH, HEADER_SPILL_MB * 2**20))
+        sp_rows = row_buffers.enter_context(RowBuffer(SP_ROW_WIDTH, HEADER_SPILL_MB * 2**20))
+        keyword_index = defaultdict(dict)  # (广告类型, 关键词键, 匹配类型) -> {活动名: 区域}
+        keyword_keys = {}  # 关键词列索引 -> 该列关键词的比较键；多个活动用同一列时只算一次
+        
+        default_bid = 0.6
+        default_sp_budget = 12  # SP default budget from header-B_US
+        
+        # ======== 第一步：读取所有区域的活动数据（此时还不生成任何行） ========
+        regions = []
+        for theme_no, target_theme in enumerate(selected_themes):
+            checkpoint(0.2 * theme_no / len(selected_themes), f"读取区域: {target_theme}")
+            if target_theme not in region_bounds:
+                ui.warning(f"跳过主题 '{target_theme}'：未找到区域")
+                continue
+            header_row, end_row = region_bounds[target_theme]
+
+            # 直接从 df_survey 切出区域：不再按 skiprows 重读文件，切片的索引就是 Excel 行号
+            activity_df = pd.DataFrame()
+            if end_row > header_row:
+                activity_df = df_survey.iloc[header_row + 1:end_row + 1].copy()
+                activity_df.columns = df_survey.iloc[header_row].tolist()  # header行作为列名
+                ui.write(f"活动数据形状 ({target_theme}): {activity_df.shape}，Excel 第 {activity_df.index[0]}-{activity_df.index[-1]} 行")
+                ui.write(f"活动列名 ({target_theme}): {list(activity_df.columns)}")
+            else:
+                ui.warning(f"无活动数据行 ({target_theme})")
+                continue
+
+            # 整列提取活动字段（每个活动带 Excel 行号）；字段所在列按区域表头从布局 schema 取
+            field_cols = region_field_columns(schema, activity_df.columns, target_theme, ui)
+            activities = extract_region_activities(activity_df, target_theme, field_cols)
+            for activity in activities.to_dict('records'):
+                if 'SP-商品推广' in target_theme:
+                    ui.write(f"  SP 活动 (第 {activity['excel_row']} 行): {activity['campaign_name']}, CPC={activity['cpc']}, 预算={activity['budget']}, 广告位={activity['ad_position']}, 百分比={activity['percentage']}")
+                else:
+                    ui.write(f"  Brand 活动 (第 {activity['excel_row']} 行): {activity['campaign_name']}, CPC={activity['cpc']}")
+            ui.write(f"Found {len(activities)} activity rows ({target_theme}): {activities['campaign_name'].tolist()}")
+            
+            # 整个区域的活动名一次性分类（类别 / 匹配类型 / 是否 ASIN）
+            campaign_classes = classify_campaigns(activities['campaign_name'].tolist(), campaign_classifier)
+            ui.write(f"活动分类 ({target_theme}):")
+            ui.write(campaign_classes)
+            regions.append({'theme': target_theme, 'activities': activities, 'field_cols': field_cols, 'classes': campaign_classes})
+
+        # ======== 第二步：统一校验，所有错误在生成前一次性报告 ========
+        validation_errors = validate_template(regions, global_settings, column_cells, header_index)
+        update_template_snapshot(snapshot)
+        if validation_errors:
+            # 使用 with error_area 确保这一堆错误都显示在外面
+            with error_area:
+                ui.error(f"🚫 检测到 Excel 模版有 {len(validation_errors)} 处问题，已停止生成！请按行号修复以下问题：")
+                ui.dataframe(pd.DataFrame(validation_errors).rename(columns=VALIDATION_ERROR_COLUMNS), hide_index=True)
+            
+            if not dry_run:
+                return None
+        else:
+            ui.info("ℹ️ 模版校验通过。")
+
+        if dry_run:
+            # 预估：校验有问题也照样给出行数，方便一次看清
+            campaign_counts, sheet_rows, overlap_groups = estimate_header_rows(
+                regions, schema, column_cells, header_index, len(neg_asin), len(neg_brand))
+            with error_area:
+                status = f"模版有 {len(validation_errors)} 处问题，修复后才能生成" if validation_errors else "模版校验通过"
+                ui.info(f"📋 预估（未生成文件）：{status}；" + "，".join(f"{sheet} {rows} 行" for sheet, rows in sheet_rows.items()))
+                if overlap_groups:
+                    ui.warning(f"⚠️ {overlap_groups} 组关键词+匹配类型被多个广告活动同时投放" +
+                               ("，已勾选重叠时停止生成，正式生成会被拦截。" if block_keyword_overlap else "，生成时会在页面上列出明细（不写入 Header 文件）。"))
+                ui.dataframe(pd.DataFrame(campaign_counts).rename(columns=ESTIMATE_COLUMNS), hide_index=True)
+            return None
+
+        # ======== 第三步：逐区域生成行 ========
+        total_campaigns = sum(len(region['activities']) for region in regions)
+        campaigns_done = 0
+        for region in regions:
+            target_theme = region['theme']
+            activity_rows = region['activities'].to_dict('records')
+            campaign_classes = region['classes']
+            
+            # Generate rows for this region
+            for activity, campaign_class in zip(activity_rows, campaign_classes.to_dict('records')):
+                campaign_name = activity['campaign_name']
+                checkpoint(0.2 + 0.75 * campaigns_done / max(total_campaigns, 1),
+                           f"生成 {target_theme}: {campaign_name} ({campaigns_done + 1}/{total_campaigns})")
+                campaigns_done += 1
+                ui.write(f"处理活动 ({target_theme}): {campaign_name}")
+
+                is_asin = False  # 初始化变量，避免 UnboundLocalError
+                
+                if 'SP-商品推广' in target_theme:
+                    # SP-specific generation
+                    cpc = float(activity['cpc']) if activity['cpc'] != '' else default_bid
+                    budget = float(activity['budget']) if activity['budget'] != '' else default_sp_budget
+                    sku = activity.get('sku', 'SKU-1')
+                    group_bid = float(activity.get('group_bid', default_bid))
+                    
+                    # Detect category and match type: 取区域批量分类的结果
+                    matched_category = campaign_class['category']
+                    is_exact = campaign_class['is_exact']
+                    is_broad = campaign_class['is_broad']
+                    is_asin = campaign_class['is_asin']  # 覆盖赋值
+                    match_type = campaign_class['match_type']  # Default exact/精准
+                    # 本活动各展开行共同的列：产品、操作、活动/广告组名称、状态
+                    sp_fixed = {0: product_sp, 2: operation, 3: campaign_name, 4: campaign_name,
+                                9: campaign_name, 10: campaign_name, 14: status}
+                    
+                    # Row1: 广告活动
+                    row1 = [product_sp, '广告活动', operation, campaign_name, '', '', '', '', '', campaign_name, '', '', '', '手动', status, 
+                            budget, '', '', '', '', '', '动态竞价 - 仅降低', '', '', '']
+                    sp_rows.append(row1)
+                    
+                    # Row2: 广告组
+                    row2 = [product_sp, '广告组', operation, campaign_name, campaign_name, '', '', '', '', campaign_name, campaign_name, '', '', '', status, 
+                            '', '', group_bid, '', '', '', '', '', '', '']
+                    sp_rows.append(row2)
+                    
+                    # Row3: 商品广告
+                    row3 = [product_sp, '商品广告', operation, campaign_name, campaign_name, '', '', '', '', campaign_name, campaign_name, '', '', '', status, 
+                            '', sku, '', '', '', '', '', '', '', '']
+                    sp_rows.append(row3)
+                    
+                    if not is_asin:
+                        # Keywords: 关键词列按 (SP, 匹配类型, 类别组) 从布局 schema 取
+                        keywords = []
+                        col_name, keyword_col_idx, used_fallback = keyword_column(schema, 'sp', campaign_class)
+                        if used_fallback:
+                            ui.warning(f"列 '{col_name}' 未找到，fallback到硬编码")
+                        
+                        if keyword_col_idx is not None:
+                            keyword_cells = column_cells[keyword_col_idx]  # 关键词 -> Excel 行号
+                            keywords = list(keyword_cells)
+                            ui.write(f"  匹配的列: {col_name} ({cell_span(keyword_col_idx, keyword_cells.values())})")
+                            ui.write(f"  关键词数量: {len(keywords)} (示例: {keywords[:2] if keywords else '无'})")
+                        else:
+                            keywords = []
+                            ui.warning(f"  无匹配列 for {matched_category} {match_type} in {target_theme}")
+                    
+                        if keywords:
+                            sp_rows.extend(fill_rows(row_template(SP_ROW_WIDTH, sp_fixed, {1: '关键词', 18: cpc, 20: match_type}), 19, keywords))
+                            if keyword_col_idx not in keyword_keys:
+                                keyword_keys[keyword_col_idx] = [keyword_key(kw) for kw in keywords]
+                            for key in keyword_keys[keyword_col_idx]:
+                                keyword_index[(product_sp, key, match_type)].setdefault(campaign_name, target_theme)
+                        else:
+                            ui.warning(f"  无关键词数据，跳过生成关键词层级 (活动: {campaign_name})")
+                        
+                        # Negative keywords: dynamic like test SB.py, with specific column selection
+                        if matched_category:
+                            # Select columns based on category and type (SP similar to Brand)
+                            selected_cols = select_negative_columns(matched_category, is_exact, is_broad)
+                            
+                            # 按匹配类型合并去重（重复否定关键词已在统一校验阶段拦截，这里只负责生成）
+                            # Generate rows: deduped kws
+                            for m_type, kws in negative_keywords(column_cells, col_indices, selected_cols).items():
+                                if kws:
+                                    ui.write(f"  {m_type} 否定关键词数量: {len(kws)}")
+                                sp_rows.extend(fill_rows(row_template(SP_ROW_WIDTH, sp_fixed, {1: '否定关键词', 20: m_type}), 19, kws))
+                    
+                    # ASIN group: generate 商品定向 and 否定商品定向
+                    if is_asin:
+                        # 商品定向: exact column match to campaign_name
+                        asin_targets = []
+                        col_idx = header_index['names'].get(str(campaign_name))
+                        if col_idx is not None:
+                            asin_cells = column_cells[col_idx]  # ASIN -> Excel 行号
+                            asin_targets = list(asin_cells)
+                            ui.write(f"  商品定向 ASIN 数量: {len(asin_targets)}，来源 {cell_span(col_idx, asin_cells.values())} (示例: {asin_targets[:2] if asin_targets else '无'})")
+                            
+                        sp_rows.extend(fill_rows(row_template(SP_ROW_WIDTH, sp_fixed, {1: '商品定向', 18: cpc}), 24,
+                                                 [f'asin="{asin}"' for asin in asin_targets]))
+                            
+                        # 否定商品定向: from global neg_asin and neg_brand
+                        neg_product_template = row_template(SP_ROW_WIDTH, sp_fixed, {1: '否定商品定向'})
+                        sp_rows.extend(fill_rows(neg_product_template, 24, neg_asin_targets))
+                        
+                        # 条件禁用: 否品牌循环
+                        if False:  # 禁用 SP 否品牌生成 (改为 True 恢复)
+                            sp_rows.extend(fill_rows(neg_product_template, 24, neg_brand_targets))
+
+                        # 新增：为 SP-ASIN 添加否定关键词 (从 AJ 和 AK 列)
+                        # Select columns for ASIN negatives: AJ (否精准), AK (否词组)
+                        asin_neg_cols = ASIN_NEG_KEYS
+                        
+                        # 按匹配类型合并去重（重复否定关键词已在统一校验阶段拦截，这里只负责生成）
+                        # Generate rows: deduped kws
+                        for m_type, kws in negative_keywords(column_cells, col_indices, asin_neg_cols).items():
+                            if kws:
+                                ui.write(f"  {m_type} ASIN 否定关键词数量: {len(kws)}")
+                            sp_rows.extend(fill_rows(row_template(SP_ROW_WIDTH, sp_fixed, {1: '否定关键词', 20: m_type}), 19, kws))
+                    
+                    # 新增/修复：竞价调整层级（仅SP，为每个活动生成1行，如果条件满足）- 移到if is_asin外
+                    row_bid_adjust = None  # 防护：初始化为空，避免UnboundLocalError
+                    ad_position = activity.get('ad_position', '').strip()
+                    percentage = activity.get('percentage', '').strip()
+                    if percentage:
+                        # 已在校验阶段确认可解析：去除百分号，转小数，再取整，例如 "50%" -> "50"
+                        percentage = str(int(float(percentage.replace('%', ''))))
+                    if ad_position and percentage:  # 只有两者都有值才生成
+                        ui.write(f"  生成竞价调整行 (活动: {campaign_name}, 广告位: {ad_position}, 百分比: {percentage})")
+                        row_bid_adjust = [
+                            product_sp, '竞价调整', operation,
+                            campaign_name, '', '', '', '', '',
+                            campaign_name, campaign_name, '', '',
+                            '手动', status,
+                            '', '', '', '', '', '',
+                            '动态竞价 - 仅降低',
+                            ad_position, percentage, ''
+                        ]
+                        sp_rows.append(row_bid_adjust)
+                    else:
+                        ui.write(f"  跳过竞价调整行 (活动: {campaign_name})：广告位或百分比为空")
+                
+                else:
+                    # Original Brand (SB/SBV) generation logic - with regional keyword rules
+                    cpc = float(activity['cpc']) if activity['cpc'] != '' else default_bid
+                    brand_budget = float(activity['budget']) if activity['budget'] != '' else 12
+                    asins_str = activity.get('asins', '')
+                    video_asset = activity.get('video_asset', '')  # 新增：从 activity 获取
+                    custom_image = activity.get('custom_image', '')  # 新增：从 activity 获取
+                    landing_url = global_settings.get('landing_url', '')
+                    landing_type = activity.get('landing_type', '')
+                    brand_name = global_settings.get('brand_name', '')
+                    creative_title = global_settings.get('creative_title', '')
+                    
+                    # 直接从 activity 字典中获取之前保存好的 logo_asset
+                    logo_asset = activity.get('logo_asset', '')
+                    
+                    # Detect category and match type: 取区域批量分类的结果
+                    matched_category = campaign_class['category']
+                    is_exact = campaign_class['is_exact']
+                    is_broad = campaign_class['is_broad']
+                    is_asin = campaign_class['is_asin']  # 覆盖赋值
+                    match_type = campaign_class['match_type']
+                    # 本活动各展开行共同的列：产品、操作、活动/广告组编号、状态
+                    brand_fixed = {0: product_brand, 2: operation, 3: campaign_name, 4: campaign_name, 9: status}
+                    
+                    # Row1: 广告活动
+                    row1 = [product_brand, '广告活动', operation, campaign_name, '', '', campaign_name, '', '', status, 
+                            global_settings.get('entity_id', ''), global_settings.get('budget_type', '每日'), brand_budget, '在亚马逊上出售', '', '', '', '', '', '', '', '', '', '', '', '', '', '']
+                    brand_rows.append(row1)
+                    
+                    # Row2: 广告组
+                    row2 = [product_brand, '广告组', operation, campaign_name, campaign_name, '', campaign_name, campaign_name, '', status, 
+                            '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '', '']
+                    brand_rows.append(row2)
+                    
+                    # Row3: 广告实体层级（品牌视频广告 / 商品集广告 / 视频广告） - 按主题分开处理，避免共用逻辑
+                    if 'SBV落地页：品牌旗舰店' in target_theme:
+                        # 品牌旗舰店视频广告
+                        row3 = [product_brand, '品牌视频广告', operation,
+                                campaign_name, campaign_name, campaign_name, '', '', campaign_name, status,
+                                '', '', '', '', '', '', '', '',
+                                landing_url, landing_type, brand_name, 'False', logo_asset, creative_title,
+                                asins_str, video_asset, custom_image, '']
+                        brand_rows.append(row3)
+
+                    elif 'SBV落地页：商品详情页' in target_theme:
+                        row3 = [
+                            product_brand, '视频广告', operation,
+                            campaign_name, campaign_name, campaign_name, '', '', campaign_name, status,
+                            '', '', '', '', '', '', '', '',
+                            '', landing_type or '', '', 'False',
+                            '', '',
+                            asins_str, video_asset, '', ''
+                        ]
+                        brand_rows.append(row3)
+
+                    elif 'SB落地页：商品集' in target_theme:
+                        # 1. 默认设置（常规规则） 
+                        final_landing_url = landing_url
+                        final_creative_asin = asins_str
+                        final_landing_asin = ''
+
+                        # 2. 应用你的新规则：如果是“商品列表” 
+                        if landing_type == '商品列表':
+                            final_landing_url = ''      # 落地页 URL 为空
+                            final_creative_asin = ''   # 创意素材 ASIN 为空
+                            final_landing_asin = asins_str  # 将原来的 ASIN 填到“落地页 ASIN”列
+                        
+                        # 3. 生成第 28 列数据行 
+                        row3 = [
+                            product_brand, '商品集广告', operation,
+                            campaign_name, campaign_name, campaign_name, '', '', campaign_name, status,
+                            '', '', '', '', '', '', '', '',
+                            final_landing_url,     # 对应第19列：落地页 URL
+                            landing_type,          # 对应第20列：落地页类型
+                            brand_name,            # 对应第21列：品牌名称
+                            'False',               # 对应第22列：同意翻译
+                            logo_asset,            # 对应第23列：品牌徽标素材编号
+                            creative_title,        # 对应第24列：创意素材标题
+                            final_creative_asin,   # 对应第25列：创意素材 ASIN
+                            video_asset,           # 对应[cite: 5, 6]：视频素材编号
+                            custom_image,          # 对应[cite: 7]：自定义图片
+                            final_landing_asin     # 对应第28列：落地页 ASIN (新规则核心)
+                        ]
+                        brand_rows.append(row3)
+                    
+                    else:
+                        ui.warning(f"未识别的 Brand 主题：{target_theme}，跳过生成广告实体行")
+                    
+                    # Keywords: dynamic column selection based on regional rules (SB/SBV)
+                    if not is_asin:
+                        # 关键词列按 (品牌, 匹配类型, 类别组) 从布局 schema 取：SB/SBV 广泛用带加号的 N/Q 列
+                        keywords = []
+                        col_name, keyword_col_idx, used_fallback = keyword_column(schema, 'brand', campaign_class)
+                        if used_fallback:
+                            ui.warning(f"列 '{col_name}' 未找到，fallback到硬编码")
+                        
+                        if keyword_col_idx is not None:
+                            keyword_cells = column_cells[keyword_col_idx]  # 关键词 -> Excel 行号
+                            keywords = list(keyword_cells)
+                            ui.write(f"  匹配的列: {col_name} ({cell_span(keyword_col_idx, keyword_cells.values())})")
+                            ui.write(f"  关键词数量: {len(keywords)} (示例: {keywords[:2] if keywords else '无'})")
+                        else:
+                            keywords = []
+                            ui.warning(f"  无匹配列 for {matched_category} {match_type} in {target_theme}")
+                
+                        if keywords:
+                            brand_rows.extend(fill_rows(row_template(BRAND_ROW_WIDTH, brand_fixed, {1: '关键词', 14: cpc, 16: match_type}), 15, keywords))
+                            if keyword_col_idx not in keyword_keys:
+                                keyword_keys[keyword_col_idx] = [keyword_key(kw) for kw in keywords]
+                            for key in keyword_keys[keyword_col_idx]:
+                                keyword_index[(product_brand, key, match_type)].setdefault(campaign_name, target_theme)
+                        else:
+                            ui.warning(f"  无关键词数据，跳过生成关键词层级 (活动: {campaign_name})")
+                        
+                        # Negative keywords: dynamic like test SB.py, with specific column selection
+                        if matched_category:
+                            # Select columns based on category and type
+                            selected_cols = select_negative_columns(matched_category, is_exact, is_broad)
+                            
+                            # 按匹配类型合并去重（重复否定关键词已在统一校验阶段拦截，这里只负责生成）
+                            # Generate rows: deduped kws
+                            for m_type, kws in negative_keywords(column_cells, col_indices, selected_cols).items():
+                                if kws:
+                                    ui.write(f"  {m_type} 否定关键词数量: {len(kws)}")
+                                brand_rows.extend(fill_rows(row_template(BRAND_ROW_WIDTH, brand_fixed, {1: '否定关键词', 16: m_type}), 15, kws))
+                    
+                    # ASIN group: generate 商品定向 and 否定商品定向
+                    if is_asin:
+                        # 商品定向: exact column match to campaign_name
+                        asin_targets = []
+                        col_idx = header_index['names'].get(str(campaign_name))
+                        if col_idx is not None:
+                            asin_cells = column_cells[col_idx]  # ASIN -> Excel 行号
+                            asin_targets = list(asin_cells)
+                            ui.write(f"  商品定向 ASIN 数量: {len(asin_targets)}，来源 {cell_span(col_idx, asin_cells.values())} (示例: {asin_targets[:2] if asin_targets else '无'})")
+                        
+                        brand_rows.extend(fill_rows(row_template(BRAND_ROW_WIDTH, brand_fixed, {1: '商品定向', 7: campaign_name, 14: cpc}), 17,
+                                                    [f'asin="{asin}"' for asin in asin_targets]))
+                        
+                        # 否定商品定向: from global neg_asin and neg_brand（两批共用一个模版）
+                        neg_product_template = row_template(BRAND_ROW_WIDTH, brand_fixed, {1: '否定商品定向', 7: campaign_name})
+                        brand_rows.extend(fill_rows(neg_product_template, 17, neg_asin_targets))
+                        brand_rows.extend(fill_rows(neg_product_template, 17, neg_brand_targets))
+        
+        # 跨活动关键词重叠：同一广告类型下同一关键词+匹配类型被多个活动投放，活动之间会互相竞价
+        overlap_rows = list(keyword_overlap_rows(keyword_index))
+        if overlap_rows:
+            overlap_groups = sum(1 for campaigns in keyword_index.values() if len(campaigns) > 1)
+            with error_area:
+                if block_keyword_overlap:
+                    ui.error(f"🚫 {overlap_groups} 组关键词+匹配类型被多个广告活动同时投放，已停止生成！请调整关键词列或活动分类：")
+                    ui.dataframe(pd.DataFrame(overlap_rows, columns=KEYWORD_OVERLAP_COLUMNS), hide_index=True)
+                    return None
+                ui.warning(f"⚠️ {overlap_groups} 组关键词+匹配类型被多个广告活动同时投放（明细如下，可从表格右上角下载；不写入 Header 文件）：")
+                ui.dataframe(pd.DataFrame(overlap_rows, columns=KEYWORD_OVERLAP_COLUMNS), hide_index=True)
+        else:
+            ui.write("关键词重叠检查：没有被多个广告活动同时投放的关键词")
+
+        # Save to BytesIO for download - 按所选格式写出（Excel 多 Sheet，或 TSV/CSV）；设了预算时按活动拆成多个文件并行写出
+        checkpoint(0.95, "写出 Header 文件")
+        update_template_snapshot(snapshot)
+        output_buffer, suffix = write_sharded_output(
+            [('品牌广告', OUTPUT_COLUMNS_BRAND, brand_rows), ('SP-商品推广', OUTPUT_COLUMNS_SP, sp_rows)], output_format,
+            max_rows_per_file, max_bytes_per_file)
+        if brand_rows.spilled or sp_rows.spilled:
+            ui.write(f"输出行超过 {HEADER_SPILL_MB:g} MB 内存上限，已转存到磁盘临时库并流式写出")
+        row_counts = len(brand_rows), len(sp_rows)
+        
+    ui.success(f"生成完成！品牌行数：{row_counts[0]}, SP行数：{row_counts[1]}")
+        
+    return output_buffer, suffix
+
+
+def render():
+    st.title("批量广告上传模版-生成工具")
+    st.markdown("""
+    ### 代码内容说明
+    新：此工具用于从上传的 Excel 文件（默认 sheet: '广告模版'）中提取全局设置、活动数据和关键词信息，生成广告 Header 文件。  
+    **主要功能：**  
+    - 支持（品牌旗舰店、商品集、商品详情页、SP-商品推广）主题的动态区域检测和数据提取。  
+    - 处理广告活动、广告组、视频/商品集广告、关键词、否定关键词、商品定向等行生成。  
+    - 自动填充默认值（如预算类型 '每日'、状态 '已启用'）。  
+    - 检测重复否定关键词并暂停生成（打印警告）。  
+    - 输出多Sheet工作簿：'品牌广告' Sheet (SB/SBV) 和 'SP-商品推广' Sheet (SP)，每个有独立列头。  
+    - 检查跨活动关键词重叠：同一关键词+匹配类型被多个活动投放时在页面上列出明细（不写入 Header 文件），可选直接停止生成。  
+
+    **使用步骤：**  
+    1. 上传 Excel 文件（文件名任意，需包含 '广告模版' sheet）。  
+    2. 点击 "生成 Header 文件" 按钮（想先看每个 Sheet 会有多少行、模版能否通过校验，点 "只校验并预估行数"，不生成文件）。  
+    3. 下载生成的 "header-YYYY-MM-DD HH:MM.xlsx" 文件（选 TSV/CSV 输出时为 .tsv/.csv，两个 Sheet 都有数据时打包成 .zip）。  
+    4. 只需要部分区域（例如只重新生成 SP）时，在 "生成的区域" 里只选这些区域，其它区域完全跳过。  
+    5. 输出太大时勾选 "拆分大文件"，按每个文件的行数/大小上限拆成多个文件（同一广告活动不会被拆开），打包成 .zip，附 manifest.json 清单。  
+
+    **注意：**  
+    - 文件需符合脚本预期结构（A 列主题行、B 列活动名称等）。  
+    - 如遇错误（如未找到主题），页面将显示日志。  
+    - 生成时间精确到分钟（基于当前时间）。  
+    """)
+
+    # File Uploader
+    uploaded_file = st.file_uploader("上传 Excel 文件", type=['xlsx', 'xls'])
+    output_format = st.radio("输出格式", list(OUTPUT_FORMATS), format_func=lambda f: OUTPUT_FORMATS[f][0], horizontal=True)
+    themes = st.multiselect("生成的区域（没选的区域不读取、不校验、不生成）", THEMES, default=THEMES)
+    max_rows_per_file = max_mb_per_file = 0
+    if st.checkbox("拆分大文件（同一广告活动不拆开）"):
+        col_rows, col_size = st.columns(2)
+        max_rows_per_file = col_rows.number_input("每个文件最多行数（0 不限）", min_value=0, value=50000, step=1000)
+        max_mb_per_file = col_size.number_input("每个文件最大 MB（0 不限，按文本大小估算）", min_value=0.0, value=0.0, step=1.0)
+    block_keyword_overlap = st.checkbox("关键词重叠时停止生成（同一关键词+匹配类型被多个广告活动投放）")
+
+    # Generate Button：生成交给共享任务池，页面只轮询排队位置和进度；任务和结果按会话保存在 session_state
+    if uploaded_file is not None:
+        uploaded_bytes = uploaded_file.getvalue()
+        upload_key = hashlib.sha1(uploaded_bytes).hexdigest()
+        job = st.session_state.get('header_job')
+        if job is not None and job.info['upload_key'] != upload_key:
+            # 换了文件：旧任务作废
+            job.cancel()
+            job = st.session_state.header_job = None
+
+        running = job is not None and not job.done()
+        generate = dry_run = False
+        if not running and not themes:
+            st.warning("请至少选择一个区域。")
+        elif not running:
+            col_generate, col_estimate = st.columns(2)
+            generate = col_generate.button("生成 Header 文件")
+            dry_run = col_estimate.button("只校验并预估行数（不生成文件）")
+        if generate or dry_run:
+            try:
+                job = st.session_state.header_job = submit_header_job(
+                    uploaded_bytes, upload_key, output_format, int(max_rows_per_file), int(max_mb_per_file * 2**20),
+                    block_keyword_overlap, dry_run, list(themes))
+                running = True
+            except PoolRejected as e:
+                st.error(f"🚫 {e}")
+
+        if running:
+            header_job_panel(job)
+        elif job is not None:
+            show_header_job_result(job)
@@ -0,0 +1,93 @@
+"""关键词拆分去重：提取表格中所有单词（保留连字符词组）并去重，可一次上传多个文件"""
+import streamlit as st
+import pandas as pd
+import io
+import os
+import sqlite3
+from datetime import datetime
+
+from keyword_library import KeywordLibrary, UntrustedLibrary
+from keyword_split import KeywordNormalizer, group_variants, split_keyword_files
+from tools.common import heavy_job_slot
+
+# ======== 关键词库：跨次上传去重（SQLite 文件，服务重启后仍在）；没有设置 TOOLBOX_KEYWORD_LIBRARY 时不提供 ========
+KEYWORD_LIBRARY_PATH = os.environ.get('TOOLBOX_KEYWORD_LIBRARY')
+
+@st.cache_resource(show_spinner=False)
+def keyword_library():
+    """打开关键词页面时才建，整个服务进程共用一个"""
+    return KeywordLibrary(KEYWORD_LIBRARY_PATH)
+
+@st.cache_resource(show_spinner=False)
+def keyword_normalizer():
+    """词形归一：服务进程共用一个（LRU 缓存跨次上传保留），拼写变体表可用 JSON 文件补充"""
+    return KeywordNormalizer.from_file(os.environ.get('TOOLBOX_KEYWORD_VARIANTS'))
+
+
+def render():
+    st.title("📝 关键词批量拆分去重工具")
+    st.markdown("一键提取并去重表格中的所有单词，支持连字符词组保留(如 `6-in-1`)。")
+    
+    # 网页版上传组件：多个搜索词报告一次上传，结果合并去重
+    kw_files = st.file_uploader("1. 请上传原始关键词表格 (Excel，可多选)", type=['xlsx', 'xls'], key="kw_tool",
+                                accept_multiple_files=True)
+    merge_variants = st.checkbox("合并词形变体（全角/半角、单复数、usb-c/usbc、拼写变体）", value=False, key="kw_merge_variants",
+                                 help="同一个词的不同写法只输出出现最多的一个，其它写法列在 Variants 列")
+    only_new = st.checkbox("只输出关键词库里没有的新词（并把新词记入词库）", key="kw_only_new",
+                           disabled=not KEYWORD_LIBRARY_PATH,
+                           help="以前处理过的词不再输出" if KEYWORD_LIBRARY_PATH
+                           else "服务没有配置关键词库（环境变量 TOOLBOX_KEYWORD_LIBRARY），不能使用")
+    
+    if kw_files:
+        if st.button("开始拆分并去重"):
+            with heavy_job_slot("关键词拆分去重"), st.spinner(f"处理中（{len(kw_files)} 个文件）..."):
+                # 每个文件在子进程里拆词（规则沿用 keyword_processor.py 的正则），再合并去重
+                all_words, file_stats = split_keyword_files([(f.name, f.getvalue()) for f in kw_files])
+                failed = [(name, error) for name, _, error in file_stats if error]
+                for name, error in failed:
+                    st.error(f"❌ {name} 读取失败，已跳过：{error}")
+                if len(failed) == len(kw_files):
+                    st.stop()
+                if len(kw_files) > 1:
+                    st.dataframe(pd.DataFrame([(name, count) for name, count, error in file_stats if not error],
+                                              columns=['文件', '词数']), hide_index=True)
+
+                # 结果排序；合并变体时每行是统一后的写法和被合并掉的写法
+                if merge_variants:
+                    variants = dict(group_variants(all_words, keyword_normalizer()))
+                    final_list = list(variants)
+                else:
+                    variants = None
+                    final_list = sorted(all_words)
+                seen_before = 0
+                if only_new:
+                    # 查词库和记入新词在同一个事务里：同时提交的两份表格不会都把同一个词当成新词
+                    try:
+                        new_words = keyword_library().new_keywords(final_list)
+                        library_size = keyword_library().count()
+                    except (UntrustedLibrary, OSError, sqlite3.Error) as e:
+                        st.error(f"❌ 关键词库不可用：{e}")
+                        st.stop()
+                    seen_before = len(final_list) - len(new_words)
+                    final_list = new_words
+                output_df = pd.DataFrame({'Unique Keywords': final_list})
+                if variants is not None:
+                    output_df['Variants'] = [', '.join(variants[w]) for w in final_list]
+                
+                # 生成下载缓存
+                towrite = io.BytesIO()
+                output_df.to_excel(towrite, index=False, engine='openpyxl')
+                towrite.seek(0)
+                
+                st.success(f"处理成功！提取出 {len(final_list)} 个独立词汇。")
+                if variants is not None:
+                    st.info(f"合并词形变体：{len(all_words)} 个写法合并为 {len(variants)} 个词。")
+                if only_new:
+                    st.info(f"已跳过词库里已有的 {seen_before} 个词，{len(final_list)} 个新词已记入词库（词库现有 {library_size} 个词）。")
+                st.download_button(
+                    label="2. 点击下载处理后的 Excel",
+                    data=towrite,
+                    file_name=f"unique_keywords_{datetime.now().strftime('%m%d_%H%M')}.xlsx",
+                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                )
+                st.stop()  # 👈 【关键】这是关键词工具的刹车
@@ -0,0 +1,530 @@
+"""xlsx 原地改写：只改目标工作表 XML 里被写到的行，其它部件原样复制。
+
+提供外箱贴填表用到的 openpyxl 工作簿子集（sheetnames / worksheets / active / ws[...] / ws.cell().value /
+max_row / max_column / merged_cells / delete_rows / save），填表函数和 safe_write 不用改就能换过来。
+不建立样式、图片、数据验证等对象模型：打开带大量样式的亚马逊模板更快，openpyxl 不认识的内容保存时也不会丢。
+- 新字符串追加到共享字符串表，原有条目和编号不变
+- 写入保留单元格原来的样式；和 openpyxl 一样，以 = 开头的字符串写成公式
+- 合并单元格：非左上角的位置返回 openpyxl 的 MergedCell，公式保护等规则由调用方（safe_write）按 openpyxl 的语义处理
+- 和 openpyxl 一样，读取 cell() 也会把该位置算进 max_row / max_column；delete_rows 不调整公式引用；
+  合并区域里的位置和单元格一起上移或删掉（与 openpyxl 一致），merged_cells 和保存的 mergeCells 也按删行收缩/上移
+- 共享公式（<f t="shared">）在读取时按 openpyxl 的方式展开成各单元格自己的普通公式：删行、上移或覆盖主单元格后
+  不会留下指向不存在主单元格的 si / 超出范围的 ref（Excel 会报修复）；工作表没改过时原样复制，不受影响
+- 改过的工作簿保存时设置打开时重新计算公式；删掉的行里有公式时去掉 calcChain
+
+对比 openpyxl 打开/保存一个工作簿的耗时：
+    python xlsx_patch.py 模版.xlsx [sheet]
+"""
+import html
+import io
+import math
+import numbers
+import re
+import sys
+import time
+import zipfile
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape
+
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE, MergedCell
+from openpyxl.formula.translate import Translator
+from openpyxl.utils import get_column_letter
+from openpyxl.utils.exceptions import IllegalCharacterError
+from openpyxl.worksheet.cell_range import CellRange, MultiCellRange
+
+from xlsx_stream import (
+    CELL_REF_PATTERN, NS_MAIN, _cell_value, _date_styles, _shared_strings, column_index, workbook_sheets,
+)
+
+SHARED_STRINGS_PATH = 'xl/sharedStrings.xml'
+CALC_CHAIN_PATH = 'xl/calcChain.xml'
+
+SHEET_DATA_PATTERN = re.compile(r'<((?:[\w.-]+:)?)sheetData\b[^>]*?(/?)>')
+REF_ATTR_PATTERN = re.compile(r'(\sr=")([A-Z]*)(\d+)(")')
+STYLE_ATTR_PATTERN = re.compile(r'\ss="(\d+)"')
+SPANS_ATTR_PATTERN = re.compile(r'\sspans="[^"]*"')
+DIMENSION_PATTERN = re.compile(r'(<(?:[\w.-]+:)?dimension\b[^>]*?\sref=")[^"]*(")')
+ACTIVE_TAB_PATTERN = re.compile(r'<(?:[\w.-]+:)?workbookView\b[^>]*?\sactiveTab="(\d+)"')
+
+
+def load_workbook(source):
+    """source 可以是路径、bytes 或文件对象（例如 streamlit 的 UploadedFile）"""
+    return PatchWorkbook(source)
+
+
+def _read_source(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    if hasattr(source, 'read'):
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        return source.read()
+    with open(source, 'rb') as f:
+        return f.read()
+
+
+class PatchWorkbook:
+    """只读取需要的部件；工作表在第一次用到时才解析"""
+
+    def __init__(self, source):
+        self._data = _read_source(source)
+        self._zip = zipfile.ZipFile(io.BytesIO(self._data))
+        sheets, self._epoch = workbook_sheets(self._zip)
+        self.worksheets = [PatchSheet(self, name, path) for name, path in sheets if path in self._zip.namelist()]
+        workbook_xml = self._zip.read('xl/workbook.xml').decode('utf-8')
+        match = ACTIVE_TAB_PATTERN.search(workbook_xml)
+        self._active_index = int(match.group(1)) if match else 0
+        self._shared_strings = None  # 第一次读写字符串时解析
+        self._string_index = None
+        self._new_strings = []
+        self._string_refs = 0
+        self._date_styles = None
+        self._drop_calc_chain = False
+
+    @property
+    def sheetnames(self):
+        return [ws.title for ws in self.worksheets]
+
+    @property
+    def active(self):
+        return self.worksheets[min(self._active_index, len(self.worksheets) - 1)]
+
+    def __getitem__(self, name):
+        for ws in self.worksheets:
+            if ws.title == name:
+                return ws
+        raise KeyError(f"Worksheet {name} does not exist.")
+
+    def __contains__(self, name):
+        return name in self.sheetnames
+
+    def shared_strings(self):
+        if self._shared_strings is None:
+            self._shared_strings = _shared_strings(self._zip)
+        return self._shared_strings
+
+    def date_styles(self):
+        if self._date_styles is None:
+            self._date_styles = _date_styles(self._zip)
+        return self._date_styles
+
+    def string_ref(self, text):
+        """字符串 -> 共享字符串编号（已有的复用，没有的追加）；工作簿没有共享字符串表时返回 None（改用内联字符串）"""
+        if SHARED_STRINGS_PATH not in self._zip.namelist():
+            return None
+        if self._string_index is None:
+            self._string_index = {}
+            for idx, value in enumerate(self.shared_strings()):
+                self._string_index.setdefault(value, idx)
+        idx = self._string_index.get(text)
+        if idx is None:
+            idx = self._string_index[text] = len(self.shared_strings()) + len(self._new_strings)
+            self._new_strings.append(text)
+        self._string_refs += 1
+        return idx
+
+    def save(self, target):
+        """改过的工作表、共享字符串表和 workbook.xml 重新写入，其余部件原样复制"""
+        parts = {ws.path: ws.render() for ws in self.worksheets if ws.modified}
+        removed = set()
+        if parts:
+            parts['xl/workbook.xml'] = _full_calc_on_load(self._zip.read('xl/workbook.xml').decode('utf-8')).encode('utf-8')
+        if self._new_strings:
+            parts[SHARED_STRINGS_PATH] = self._patched_shared_strings()
+        if self._drop_calc_chain and CALC_CHAIN_PATH in self._zip.namelist():
+            # 公式单元格被删掉后 calcChain 会指向不存在的单元格，Excel 打开时报修复；去掉后 Excel 会自己重建
+            removed.add(CALC_CHAIN_PATH)
+            parts['[Content_Types].xml'] = re.sub(
+                r'<(?:[\w.-]+:)?Override\b[^>]*PartName="/xl/calcChain\.xml"[^>]*/>', '',
+                self._zip.read('[Content_Types].xml').decode('utf-8')).encode('utf-8')
+            rels_path = 'xl/_rels/workbook.xml.rels'
+            parts[rels_path] = re.sub(
+                r'<(?:[\w.-]+:)?Relationship\b[^>]*Target="[^"]*calcChain\.xml"[^>]*/>', '',
+                self._zip.read(rels_path).decode('utf-8')).encode('utf-8')
+        with zipfile.ZipFile(target, 'w') as out:
+            for info in self._zip.infolist():
+                if info.filename in removed:
+                    continue
+                data = parts.get(info.filename)
+                copy = zipfile.ZipInfo(info.filename, info.date_time)
+                copy.compress_type, copy.external_attr = info.compress_type, info.external_attr
+                out.writestr(copy, data if data is not None else self._zip.read(info))
+
+    def _patched_shared_strings(self):
+        xml = self._zip.read(SHARED_STRINGS_PATH).decode('utf-8')
+        match = re.search(r'<((?:[\w.-]+:)?)sst\b[^>]*?(/?)>', xml)
+        prefix, self_closing = match.group(1), match.group(2)
+        items = ''.join(f'<{prefix}si>{_text_xml(prefix, text)}</{prefix}si>' for text in self._new_strings)
+        start_tag = match.group(0)
+        total = len(self.shared_strings()) + len(self._new_strings)
+        new_start = re.sub(r'(\suniqueCount=")\d+(")', rf'\g<1>{total}\g<2>', start_tag)
+        new_start = re.sub(r'(\scount=")(\d+)(")', lambda m: f'{m.group(1)}{int(m.group(2)) + self._string_refs}{m.group(3)}',
+                           new_start)
+        if self_closing:
+            new_start = new_start[:-2].rstrip() + '>'
+            return (xml[:match.start()] + new_start + items + f'</{prefix}sst>' + xml[match.end():]).encode('utf-8')
+        end = xml.rindex(f'</{prefix}sst>')
+        return (xml[:match.start()] + new_start + xml[match.end():end] + items + xml[end:]).encode('utf-8')
+
+
+class PatchCell:
+    """普通单元格：读值、赋值（赋值记到工作表上，保存时写进 XML）"""
+    __slots__ = ('parent', 'row', 'column')
+
+    def __init__(self, parent, row, column):
+        self.parent = parent
+        self.row = row
+        self.column = column
+
+    @property
+    def coordinate(self):
+        return f"{get_column_letter(self.column)}{self.row}"
+
+    @property
+    def value(self):
+        return self.parent._values.get((self.row, self.column))
+
+    @value.setter
+    def value(self, value):
+        self.parent._write(self.row, self.column, value)
+
+
+class PatchSheet:
+
+    def __init__(self, workbook, title, path):
+        self.parent = workbook
+        self.title = title
+        self.path = path
+        self._loaded = False
+        self.modified = False
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._loaded = True
+        xml = self.parent._zip.read(self.path).decode('utf-8')
+        match = SHEET_DATA_PATTERN.search(xml)
+        self._prefix = match.group(1)
+        if match.group(2):  # <sheetData/>：空表
+            self._head = xml[:match.start()] + f'<{self._prefix}sheetData>'
+            body = ''
+            self._tail = f'</{self._prefix}sheetData>' + xml[match.end():]
+        else:
+            end = xml.index(f'</{self._prefix}sheetData>', match.end())
+            self._head, body, self._tail = xml[:match.end()], xml[match.end():end], xml[end:]
+        p = re.escape(self._prefix)
+        self._row_pattern = re.compile(rf'<{p}row\b[^>]*?/>|<{p}row\b[^>]*>.*?</{p}row>', re.DOTALL)
+        self._cell_pattern = re.compile(rf'<{p}c\b[^>]*?/>|<{p}c\b[^>]*>.*?</{p}c>', re.DOTALL)
+        self._start_tag_pattern = re.compile(rf'<{p}(?:row|c)\b[^>]*>')
+
+        self._rows = {}       # 行号 -> 行 XML（保存时原样输出，除非这一行被改过）
+        self._values = {}     # (行, 列) -> 值，公式为 '=...'
+        self._formulas = set()
+        self._present = set()  # XML 里有 <c> 的位置
+        self._cells = set()    # openpyxl 语义下“存在”的位置：XML 里有的 + 读写过的（决定 max_row / max_column）
+        self._writes = {}      # (行, 列) -> 待写入的值
+        self._merged = []
+        self._merged_changed = False
+
+        row_number = 0
+        for row_xml in self._row_pattern.findall(body):
+            row_number = self._row_number(row_xml, row_number + 1)
+            self._rows[row_number] = row_xml
+        if self._expand_shared_formulas():
+            xml = self._head + ''.join(self._rows.values()) + self._tail
+        self._parse_values(xml)
+
+    def _expand_shared_formulas(self):
+        """共享公式改写成普通公式：主单元格去掉 t/ref/si，其它单元格写入按相对位置平移后的公式。有改写时返回 True"""
+        p = re.escape(self._prefix)
+        formula_pattern = re.compile(rf'<{p}f\b([^>]*?)(?:/>|>(.*?)</{p}f>)', re.DOTALL)
+        masters = {}  # si -> (主单元格地址, 公式)；主单元格在文档顺序里总是在前
+        expanded = False
+
+        def expand_cell(cell_xml, ref):
+            nonlocal expanded
+            match = formula_pattern.search(cell_xml)
+            if match is None or not re.search(r'\st="shared"', match.group(1)):
+                return cell_xml
+            si = re.search(r'\ssi="(\d+)"', match.group(1)).group(1)
+            if match.group(2):
+                formula = '=' + html.unescape(match.group(2))
+                masters[si] = (ref, formula)
+            elif si in masters:
+                origin, master_formula = masters[si]
+                formula = Translator(master_formula, origin=origin).translate_formula(ref)
+            else:
+                return cell_xml
+            expanded = True
+            return f'{cell_xml[:match.start()]}<{self._prefix}f>{escape(formula[1:])}</{self._prefix}f>{cell_xml[match.end():]}'
+
+        for row, row_xml in self._rows.items():
+            if 't="shared"' not in row_xml:
+                continue
+            col = 0
+
+            def expand_row_cell(cell_match):
+                nonlocal col
+                cell_xml = cell_match.group(0)
+                match = REF_ATTR_PATTERN.search(cell_xml[:cell_xml.index('>')])
+                col = column_index(match.group(2)) + 1 if match else col + 1
+                return expand_cell(cell_xml, f"{get_column_letter(col)}{row}")
+
+            self._rows[row] = self._cell_pattern.sub(expand_row_cell, row_xml)
+        return expanded
+
+    def _row_number(self, row_xml, default):
+        match = REF_ATTR_PATTERN.search(row_xml[:row_xml.index('>')])
+        return int(match.group(3)) if match else default
+
+    def _parse_values(self, xml):
+        shared_strings = self.parent.shared_strings()
+        date_styles = self.parent.date_styles()
+        row_tag, cell_tag, merge_tag = NS_MAIN + 'row', NS_MAIN + 'c', NS_MAIN + 'mergeCell'
+        row_number = 0
+        col = 0
+        for event, elem in iterparse(io.BytesIO(xml.encode('utf-8')), events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == row_tag:
+                    row_number = int(elem.get('r') or row_number + 1)
+                    col = 0
+                continue
+            if elem.tag == cell_tag:
+                ref = elem.get('r')
+                col = column_index(CELL_REF_PATTERN.match(ref).group(1)) + 1 if ref else col + 1
+                key = (row_number, col)
+                self._present.add(key)
+                self._cells.add(key)
+                formula = elem.find(NS_MAIN + 'f')
+                if formula is not None:
+                    self._values[key] = '=' + (formula.text or '')
+                    self._formulas.add(key)
+                else:
+                    inline = elem.find(NS_MAIN + 'is')
+                    inline_text = ''.join(t.text or '' for t in inline.iter(NS_MAIN + 't')) if inline is not None else None
+                    v = elem.find(NS_MAIN + 'v')
+                    value = _cell_value(elem.get('t'), v.text if v is not None else None, inline_text,
+                                        int(elem.get('s', 0)), shared_strings, date_styles, self.parent._epoch)
+                    if value is not None:
+                        self._values[key] = value
+            elif elem.tag == merge_tag:
+                self._merged.append(elem.get('ref'))
+            elif elem.tag == row_tag:
+                elem.clear()
+        self._merged_cells = MultiCellRange(' '.join(self._merged))
+        # 合并区域里非左上角的位置：openpyxl 读取时丢掉它们的值（openpyxl 在这些位置放 MergedCell，删行时随单元格移动）
+        self._merged_positions = set()
+        for ref in self._merged:
+            cell_range = CellRange(ref)
+            for row in range(cell_range.min_row, cell_range.max_row + 1):
+                for col in range(cell_range.min_col, cell_range.max_col + 1):
+                    if (row, col) != (cell_range.min_row, cell_range.min_col):
+                        self._merged_positions.add((row, col))
+                        self._values.pop((row, col), None)
+
+    # ---- openpyxl 兼容的接口 ----
+    def cell(self, row, column):
+        self._load()
+        if row < 1 or column < 1:
+            raise ValueError("Row or column values must be at least 1")
+        self._cells.add((row, column))
+        if (row, column) in self._merged_positions:
+            return MergedCell(self, row, column)
+        return PatchCell(self, row, column)
+
+    def __getitem__(self, coordinate):
+        col, row = CELL_REF_PATTERN.match(coordinate).groups()
+        return self.cell(int(row), column_index(col) + 1)
+
+    @property
+    def merged_cells(self):
+        self._load()
+        return self._merged_cells
+
+    @property
+    def max_row(self):
+        self._load()
+        return max((row for row, _ in self._cells), default=1)
+
+    @property
+    def max_column(self):
+        self._load()
+        return max((col for _, col in self._cells), default=1)
+
+    def delete_rows(self, idx, amount=1):
+        """删除 idx 起的 amount 行，下面的行上移（与 openpyxl 一样不调整公式引用）。
+        合并区域的位置和单元格一起移动/删除；区域本身去掉被删的行，剩不到两个单元格的区域取消合并"""
+        self._load()
+        last = idx + amount - 1
+
+        def shift(keys):
+            return {(row - amount if row > last else row, col) for row, col in keys if not idx <= row <= last}
+
+        if any(idx <= row <= last for row, _ in self._formulas):
+            self.parent._drop_calc_chain = True
+        self._values = {(row - amount if row > last else row, col): v
+                        for (row, col), v in self._values.items() if not idx <= row <= last}
+        self._writes = {(row - amount if row > last else row, col): v
+                        for (row, col), v in self._writes.items() if not idx <= row <= last}
+        self._formulas, self._present, self._cells = shift(self._formulas), shift(self._present), shift(self._cells)
+        self._merged_positions = shift(self._merged_positions)
+        merged = []
+        for ref in self._merged:
+            cell_range = CellRange(ref)
+            kept = [row - amount if row > last else row
+                    for row in range(cell_range.min_row, cell_range.max_row + 1) if not idx <= row <= last]
+            if not kept or (len(kept) == 1 and cell_range.min_col == cell_range.max_col):
+                continue
+            merged.append(CellRange(min_col=cell_range.min_col, min_row=min(kept),
+                                    max_col=cell_range.max_col, max_row=max(kept)).coord)
+        if merged != self._merged:
+            self._merged, self._merged_changed = merged, True
+            self._merged_cells = MultiCellRange(' '.join(merged))
+        rows = {}
+        for row, row_xml in self._rows.items():
+            if idx <= row <= last:
+                continue
+            if row > last:
+                row_xml = self._start_tag_pattern.sub(lambda m: REF_ATTR_PATTERN.sub(
+                    lambda r: f'{r.group(1)}{r.group(2)}{int(r.group(3)) - amount}{r.group(4)}', m.group(0)), row_xml)
+                row -= amount
+            rows[row] = row_xml
+        self._rows = rows
+        self.modified = True
+
+    # ---- 写入和输出 ----
+    def _write(self, row, column, value):
+        if isinstance(value, str) and ILLEGAL_CHARACTERS_RE.search(value):
+            raise IllegalCharacterError(f"{value} cannot be used in worksheets.")
+        if value is not None and not isinstance(value, (bool, numbers.Number, str)):
+            raise ValueError(f"Cannot convert {value!r} to Excel")
+        self._writes[(row, column)] = value
+        self._cells.add((row, column))
+        if value is None:
+            self._values.pop((row, column), None)
+        else:
+            self._values[(row, column)] = value
+        if (row, column) in self._formulas:
+            self._formulas.discard((row, column))
+            self.parent._drop_calc_chain = True
+        self.modified = True
+
+    def _cell_xml(self, row, column, value, style):
+        p = self._prefix
+        ref = f"{get_column_letter(column)}{row}"
+        s = f' s="{style}"' if style else ''
+        if value is None or (isinstance(value, float) and not math.isfinite(value)):
+            return f'<{p}c r="{ref}"{s}/>'
+        if isinstance(value, bool):
+            return f'<{p}c r="{ref}"{s} t="b"><{p}v>{int(value)}</{p}v></{p}c>'
+        if isinstance(value, numbers.Integral):
+            return f'<{p}c r="{ref}"{s}><{p}v>{int(value)}</{p}v></{p}c>'
+        if isinstance(value, numbers.Number):
+            return f'<{p}c r="{ref}"{s}><{p}v>{float(value)!r}</{p}v></{p}c>'
+        if value.startswith('=') and len(value) > 1:
+            self._formulas.add((row, column))
+            return f'<{p}c r="{ref}"{s}><{p}f>{escape(value[1:])}</{p}f></{p}c>'
+        idx = self.parent.string_ref(value)
+        if idx is None:
+            return f'<{p}c r="{ref}"{s} t="inlineStr"><{p}is>{_text_xml(p, value)}</{p}is></{p}c>'
+        return f'<{p}c r="{ref}"{s} t="s"><{p}v>{idx}</{p}v></{p}c>'
+
+    def _patched_row(self, row, row_xml, writes):
+        """按列合并原有单元格和写入；写到已有单元格时保留样式"""
+        p = self._prefix
+        if row_xml is None:
+            start_tag, inner, trailing = f'<{p}row r="{row}">', '', ''
+        elif row_xml.endswith('/>') and row_xml.index('>') == len(row_xml) - 1:
+            start_tag, inner, trailing = row_xml[:-2].rstrip() + '>', '', ''
+        else:
+            end = row_xml.index('>') + 1
+            start_tag, inner = row_xml[:end], row_xml[end:-len(f'</{p}row>')]
+            trailing = ''
+            ext = inner.find(f'<{p}extLst')
+            if ext != -1:
+                inner, trailing = inner[:ext], inner[ext:]
+        start_tag = SPANS_ATTR_PATTERN.sub('', start_tag)  # spans 只是提示，改过的行去掉
+        cells = {}
+        col = 0
+        for cell_xml in self._cell_pattern.findall(inner):
+            match = REF_ATTR_PATTERN.search(cell_xml[:cell_xml.index('>')])
+            col = column_index(match.group(2)) + 1 if match else col + 1
+            cells[col] = cell_xml
+        for col, value in writes.items():
+            old = cells.get(col)
+            style = None
+            if old is not None:
+                match = STYLE_ATTR_PATTERN.search(old[:old.index('>')])
+                style = match.group(1) if match else None
+            elif value is None:
+                continue
+            cells[col] = self._cell_xml(row, col, value, style)
+            self._present.add((row, col))
+        return f'{start_tag}{"".join(cells[c] for c in sorted(cells))}{trailing}</{p}row>'
+
+    def render(self):
+        writes_by_row = {}
+        for (row, col), value in self._writes.items():
+            writes_by_row.setdefault(row, {})[col] = value
+        rows = dict(self._rows)
+        for row, writes in writes_by_row.items():
+            rows[row] = self._patched_row(row, rows.get(row), writes)
+        head = self._head
+        if self._present:
+            rows_used = [row for row, _ in self._present]
+            cols_used = [col for _, col in self._present]
+            dimension = f"{get_column_letter(min(cols_used))}{min(rows_used)}:{get_column_letter(max(cols_used))}{max(rows_used)}"
+            head = DIMENSION_PATTERN.sub(rf'\g<1>{dimension}\g<2>', head, count=1)
+        tail = self._tail
+        if self._merged_changed:
+            p = self._prefix
+            merge_xml = (f'<{p}mergeCells count="{len(self._merged)}">' +
+                         ''.join(f'<{p}mergeCell ref="{ref}"/>' for ref in self._merged) + f'</{p}mergeCells>'
+                         if self._merged else '')
+            tail = re.sub(rf'<{re.escape(p)}mergeCells\b[^>]*?(?:/>|>.*?</{re.escape(p)}mergeCells>)', lambda m: merge_xml,
+                          tail, count=1, flags=re.DOTALL)
+        return (head + ''.join(rows[row] for row in sorted(rows)) + tail).encode('utf-8')
+
+
+def _text_xml(prefix, text):
+    space = ' xml:space="preserve"' if text != text.strip() or '\n' in text else ''
+    return f'<{prefix}t{space}>{escape(text)}</{prefix}t>'
+
+
+def _full_calc_on_load(workbook_xml):
+    """单元格改过后缓存的公式结果可能过期：让 Excel 打开时重新计算（openpyxl 保存时也是这样设置的）"""
+    match = re.search(r'<((?:[\w.-]+:)?)calcPr\b[^>]*?/?>', workbook_xml)
+    if match:
+        tag = match.group(0)
+        if 'fullCalcOnLoad=' in tag:
+            new_tag = re.sub(r'fullCalcOnLoad="[^"]*"', 'fullCalcOnLoad="1"', tag)
+        else:
+            new_tag = re.sub(r'(/?>)$', r' fullCalcOnLoad="1"\1', tag)
+        return workbook_xml[:match.start()] + new_tag + workbook_xml[match.end():]
+    prefix = re.search(r'<((?:[\w.-]+:)?)workbook\b', workbook_xml).group(1)
+    # calcPr 在 sheets / functionGroups / externalReferences / definedNames 之后
+    anchor = max(workbook_xml.rfind(f'</{prefix}{tag}>') + len(f'</{prefix}{tag}>') if f'</{prefix}{tag}>' in workbook_xml else -1
+                 for tag in ('sheets', 'functionGroups', 'externalReferences', 'definedNames'))
+    return workbook_xml[:anchor] + f'<{prefix}calcPr fullCalcOnLoad="1"/>' + workbook_xml[anchor:]
+
+
+def main():
+    import openpyxl
+
+    path = sys.argv[1]
+    sheet_name = sys.argv[2] if len(sys.argv) > 2 else None
+
+    def round_trip(load):
+        started = time.perf_counter()
+        wb = load(path)
+        ws = wb[sheet_name] if sheet_name else wb.active
+        ws.cell(row=ws.max_row + 1, column=1).value = 'xlsx_patch'
+        wb.save(io.BytesIO())
+        return time.perf_counter() - started
+
+    print(f"openpyxl  : {round_trip(openpyxl.load_workbook):.2f}s")
+    print(f"xlsx_patch: {round_trip(load_workbook):.2f}s")
+
+
+if __name__ == '__main__':
+    main()
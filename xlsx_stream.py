@@ -0,0 +1,271 @@
+"""轻量 xlsx 读取：直接从 zip 里流式解析工作表 XML，只取单元格的值。
+
+不建立 openpyxl 的工作簿对象模型：共享字符串表只解析一次，工作表用 iterparse 逐行读、读完即释放。
+iter_sheet_rows 逐行产出 (Excel 行号, 值列表)；read_sheet_frame 产出与 pd.read_excel(header=0) 相同的 DataFrame。
+
+对比 pd.read_excel 的读取耗时和内存：
+    python xlsx_stream.py 模版.xlsx 广告模版
+"""
+import io
+import posixpath
+import re
+import sys
+import time
+import tracemalloc
+import zipfile
+from xml.etree.ElementTree import iterparse
+
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel, from_ISO8601
+
+NS_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+NS_REL = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+NS_PKG_REL = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+CELL_REF_PATTERN = re.compile(r'([A-Z]+)(\d+)')
+# 内置日期/时间数字格式编号
+BUILTIN_DATE_FORMATS = set(range(14, 23)) | {45, 46, 47}
+# 自定义格式去掉引号内文字、转义字符和颜色/条件段后，含 y/m/d/h/s 即视为日期
+DATE_FORMAT_STRIP_PATTERN = re.compile(r'"[^"]*"|\\.|\[[^\]]*\]')
+DATE_FORMAT_PATTERN = re.compile(r'[ymdhs]', re.IGNORECASE)
+
+
+class SheetNotFound(KeyError):
+    """工作簿里没有指定名称的工作表"""
+
+
+def column_index(letters):
+    """列字母 -> 0-based 列索引（A -> 0, AA -> 26）"""
+    idx = 0
+    for ch in letters:
+        idx = idx * 26 + ord(ch) - 64
+    return idx - 1
+
+
+def _open_zip(source):
+    """source 可以是路径、bytes 或文件对象（例如 streamlit 的 UploadedFile）"""
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    return zipfile.ZipFile(source)
+
+
+def workbook_sheets(zf):
+    """工作簿里所有工作表的 [(名称, zip 内 XML 路径)]（按工作簿中的顺序），以及日期纪元"""
+    rels = {}
+    with zf.open('xl/_rels/workbook.xml.rels') as f:
+        for _, elem in iterparse(f):
+            if elem.tag == NS_PKG_REL + 'Relationship':
+                rels[elem.get('Id')] = elem.get('Target')
+    sheets = []
+    epoch = CALENDAR_WINDOWS_1900
+    with zf.open('xl/workbook.xml') as f:
+        for _, elem in iterparse(f):
+            if elem.tag == NS_MAIN + 'sheet':
+                sheets.append((elem.get('name'), rels.get(elem.get(NS_REL + 'id'))))
+            elif elem.tag == NS_MAIN + 'workbookPr' and elem.get('date1904') in ('1', 'true'):
+                epoch = CALENDAR_MAC_1904
+    paths = []
+    for name, target in sheets:
+        target = target.lstrip('/')
+        paths.append((name, target if target.startswith('xl/') else posixpath.normpath(posixpath.join('xl', target))))
+    return paths, epoch
+
+
+def _sheet_path(zf, sheet_name):
+    """按工作表名找到 zip 内的 XML 路径（sheet_name 为 None 时取第一个工作表），以及工作簿的日期纪元"""
+    sheets, epoch = workbook_sheets(zf)
+    for name, path in sheets:
+        if sheet_name is None or name == sheet_name:
+            return path, epoch
+    raise SheetNotFound(f"Worksheet named '{sheet_name}' not found")
+
+
+def _shared_strings(zf):
+    """共享字符串表只解析一次；富文本按 <t> 片段拼接（忽略注音 rPh）"""
+    if 'xl/sharedStrings.xml' not in zf.namelist():
+        return []
+    strings = []
+    parts = []
+    in_phonetic = False
+    with zf.open('xl/sharedStrings.xml') as f:
+        for event, elem in iterparse(f, events=('start', 'end')):
+            tag = elem.tag
+            if tag == NS_MAIN + 'rPh':
+                in_phonetic = event == 'start'
+            elif event == 'end':
+                if tag == NS_MAIN + 't' and not in_phonetic:
+                    parts.append(elem.text or '')
+                elif tag == NS_MAIN + 'si':
+                    strings.append(''.join(parts))
+                    parts = []
+                    elem.clear()
+    return strings
+
+
+def _date_styles(zf):
+    """返回数字格式为日期的单元格样式编号集合（单元格 s 属性）"""
+    if 'xl/styles.xml' not in zf.namelist():
+        return set()
+    custom_formats = {}
+    date_styles = set()
+    in_cell_xfs = False
+    xf_idx = 0
+    with zf.open('xl/styles.xml') as f:
+        for event, elem in iterparse(f, events=('start', 'end')):
+            tag = elem.tag
+            if event == 'end' and tag == NS_MAIN + 'numFmt':
+                custom_formats[int(elem.get('numFmtId'))] = elem.get('formatCode', '')
+            elif tag == NS_MAIN + 'cellXfs':
+                in_cell_xfs = event == 'start'
+            elif in_cell_xfs and event == 'start' and tag == NS_MAIN + 'xf':
+                fmt_id = int(elem.get('numFmtId', 0))
+                if fmt_id in custom_formats:
+                    code = DATE_FORMAT_STRIP_PATTERN.sub('', custom_formats[fmt_id])
+                    is_date = bool(DATE_FORMAT_PATTERN.search(code))
+                else:
+                    is_date = fmt_id in BUILTIN_DATE_FORMATS
+                if is_date:
+                    date_styles.add(xf_idx)
+                xf_idx += 1
+    return date_styles
+
+
+def _number(text):
+    """与 openpyxl 一致：含小数点/指数的按 float，否则按 int"""
+    if '.' in text or 'E' in text or 'e' in text:
+        return float(text)
+    return int(text)
+
+
+def _cell_value(cell_type, raw, inline_text, style, shared_strings, date_styles, epoch):
+    if cell_type == 'inlineStr':
+        return inline_text
+    if raw is None:
+        return None
+    if cell_type == 's':
+        return shared_strings[int(raw)]
+    if cell_type == 'str':
+        return raw
+    if cell_type == 'd':
+        return from_ISO8601(raw)
+    if cell_type == 'b':
+        return raw == '1'
+    if cell_type == 'e':
+        return ErrorValue(raw)
+    value = _number(raw)
+    if style in date_styles:
+        return from_excel(value, epoch)  # 与 openpyxl 相同的换算（含 1900 闰年问题和微秒取整）
+    return value
+
+
+class ErrorValue(str):
+    """单元格错误值（#N/A、#DIV/0! 等）"""
+
+
+def iter_sheet_rows(source, sheet_name=None):
+    """逐行产出 (Excel 行号, 值列表)，值列表按列位置排列，空单元格为 None；完全没有单元格的行不产出"""
+    with _open_zip(source) as zf:
+        path, epoch = _sheet_path(zf, sheet_name)
+        shared_strings = _shared_strings(zf)
+        date_styles = _date_styles(zf)
+        sheet_data_tag, row_tag, cell_tag = NS_MAIN + 'sheetData', NS_MAIN + 'row', NS_MAIN + 'c'
+        value_tag, text_tag, inline_tag = NS_MAIN + 'v', NS_MAIN + 't', NS_MAIN + 'is'
+        with zf.open(path) as f:
+            row_number = 0
+            parent = None
+            for event, elem in iterparse(f, events=('start', 'end')):
+                if event == 'start':
+                    if elem.tag == sheet_data_tag:
+                        parent = elem
+                    continue
+                if elem.tag != row_tag:
+                    continue
+                row_number = int(elem.get('r') or row_number + 1)
+                values = []
+                for cell in elem.iter(cell_tag):
+                    ref = cell.get('r')
+                    col = column_index(CELL_REF_PATTERN.match(ref).group(1)) if ref else len(values)
+                    inline = cell.find(inline_tag)
+                    inline_text = ''.join(t.text or '' for t in inline.iter(text_tag)) if inline is not None else None
+                    v = cell.find(value_tag)
+                    value = _cell_value(cell.get('t'), v.text if v is not None else None, inline_text,
+                                        int(cell.get('s', 0)), shared_strings, date_styles, epoch)
+                    if col >= len(values):
+                        values.extend([None] * (col - len(values) + 1))
+                    values[col] = value
+                # 读完即从 sheetData 移除，整张表不会同时留在内存里
+                if parent is not None:
+                    parent.clear()
+                else:
+                    elem.clear()
+                yield row_number, values
+
+
+def sheet_data(source, sheet_name=None):
+    """按 pandas openpyxl 引擎的规则整理成二维列表：
+    空单元格为 ''、错误值为 NaN、整数值的 float 转 int，行尾空格和表尾空行去掉，缺失的行补成空行，各行补齐到同一宽度"""
+    data = []
+    last_row_with_data = -1
+    for row_number, values in iter_sheet_rows(source, sheet_name):
+        while len(data) < row_number - 1:
+            data.append([])
+        row = []
+        for value in values:
+            if value is None:
+                row.append('')
+            elif isinstance(value, ErrorValue):
+                row.append(float('nan'))
+            elif isinstance(value, float) and value.is_integer():
+                row.append(int(value))
+            else:
+                row.append(value)
+        while row and row[-1] == '':
+            row.pop()
+        if row:
+            last_row_with_data = len(data)
+        data.append(row)
+    data = data[:last_row_with_data + 1]
+    if data:
+        width = max(len(row) for row in data)
+        data = [row + [''] * (width - len(row)) for row in data]
+    return data
+
+
+def read_sheet_frame(source, sheet_name=None):
+    """第 1 行作表头读成 DataFrame，结果与 pd.read_excel(source, sheet_name, header=0) 一致"""
+    import pandas as pd
+    from pandas.errors import EmptyDataError
+    from pandas.io.parsers import TextParser
+
+    data = sheet_data(source, sheet_name)
+    try:
+        return TextParser(data, header=0, skip_blank_lines=False).read()
+    except EmptyDataError:
+        return pd.DataFrame()
+
+
+def main():
+    import pandas as pd
+
+    path = sys.argv[1]
+    sheet_name = sys.argv[2] if len(sys.argv) > 2 else None
+
+    def measure(read):
+        # 先单独计时，再开 tracemalloc 测峰值（tracemalloc 会明显拖慢速度）
+        started = time.perf_counter()
+        df = read()
+        elapsed = time.perf_counter() - started
+        tracemalloc.start()
+        read()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return df, elapsed, peak
+
+    df_stream, t_stream, m_stream = measure(lambda: read_sheet_frame(path, sheet_name))
+    df_pandas, t_pandas, m_pandas = measure(lambda: pd.read_excel(path, sheet_name=sheet_name or 0, header=0))
+    print(f"xlsx_stream : {t_stream:.2f}s, peak {m_stream / 2**20:.1f} MiB, shape {df_stream.shape}")
+    print(f"pd.read_excel: {t_pandas:.2f}s, peak {m_pandas / 2**20:.1f} MiB, shape {df_pandas.shape}")
+    print("identical:", df_stream.equals(df_pandas) and list(df_stream.columns) == list(df_pandas.columns))
+
+
+if __name__ == '__main__':
+    main()